@@ -1,5 +1,7 @@
 import streamlit as st
 import geo_functions as gf
+import geo_store as gs
+import geo_jobs as gj
 #import locale
 
 
@@ -24,14 +26,12 @@ st.markdown(
 st.subheader("Upload dos dados:")
 uploaded_files = st.file_uploader("Escolha um ou mais arquivos para enviar:", type='json', accept_multiple_files=True)
 
-df = st.session_state.get('df')  # Tenta acessar os dados do session_state
+df = gs.current_dataset()  # Tenta acessar o dataset associado à sessão
 
-# Se os dados já estão no session_state, não precisa fazer o upload novamente
-if 'df' not in st.session_state and uploaded_files:
-    # Processa os arquivos e armazena no session_state
-    df = gf.load_data(uploaded_files)
-    df = gf.add_h3(df)
-    st.session_state.df = df
+# Se os dados já estão associados à sessão, não precisa fazer o upload novamente
+if df is None and uploaded_files:
+    # Processa os arquivos (ou reaproveita o dataset de outra sessão) e guarda apenas a chave no session_state
+    df = gs.open_dataset(uploaded_files, lambda: gf.add_h3(gf.load_data(uploaded_files)))
 
     # Exibe o sumário e a amostra dos dados
     st.subheader("Sumário dos Dados:")
@@ -43,11 +43,10 @@ if 'df' not in st.session_state and uploaded_files:
     col4.metric("**Data Final:**", value=df['timestamp'].max().strftime('%d-%m-%Y'))
     st.divider()
     st.subheader("Amostra dos Dados:")
-    st.dataframe(df.head(50))  # Exibe apenas as 50 primeiras linhas
+    st.dataframe(df.head(50).drop(columns=gf.INTERNAL_COLUMNS))  # Exibe apenas as 50 primeiras linhas
 
-elif 'df' in st.session_state:
-    # Se os dados já estiverem no session_state, apenas exibe os sumários
-    df = st.session_state.df
+elif df is not None:
+    # Se os dados já estiverem associados à sessão, apenas exibe os sumários
     st.subheader("Sumário dos Dados:")
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("**Quantidade IDs Únicos:**", value=df['registrationID'].unique().size)
@@ -57,23 +56,33 @@ elif 'df' in st.session_state:
     col4.metric("**Data Final:**", value=df['timestamp'].max().strftime('%d-%m-%Y'))
     st.divider()
     st.subheader("Amostra dos Dados:")
-    st.dataframe(df.head(50))  # Exibe apenas as 50 primeiras linhas
+    st.dataframe(df.head(50).drop(columns=gf.INTERNAL_COLUMNS))  # Exibe apenas as 50 primeiras linhas
 
 
 else:
-    st.stop()  # Se não houver dados nem no session_state nem no upload, pare a execução
+    st.stop()  # Se não houver dados nem associados à sessão nem no upload, pare a execução
 
 st.divider()
 st.subheader("Exportar Dados:")
-# Check-box para ativar a exportação
-export_option = st.button("Exportar")
-
-if export_option:
-    # Exibe a mensagem de "Aguarde" enquanto os dados estão sendo processados
-    with st.spinner("Aguarde, preparando os dados..."):
-        # Gera os arquivos CSV e KML em cache
-        csv_data = gf.export_csv(df)
-        kml_data = gf.export_kml(df)
+# Botão para iniciar a exportação em segundo plano (o job continua mesmo se a página for alterada)
+if st.button("Exportar"):
+    gj.submit('export', gf.export_files, df, restart=True)
+
+export_job = gj.session_job('export')
+export_status = gj.status(export_job) if export_job is not None else None
+
+if export_status in (gj.PENDING, gj.RUNNING):
+    # Exibe o andamento enquanto os dados estão sendo processados
+    gj.job_status(export_job.id, "Aguarde, preparando os dados...")
+
+elif export_status == gj.FAILED:
+    st.error(f"Ocorreu um erro ao exportar os dados: {export_job.error}")
+
+elif export_status == gj.CANCELLED:
+    st.info("Exportação cancelada.")
+
+elif export_status == gj.DONE:
+    csv_data, kml_data = export_job.result
 
     # Exibe os botões para download após o processamento
     st.subheader("Exportar dados como CSV ou KML")
@@ -3,6 +3,7 @@ import pandas as pd
 #import locale
 import altair as alt
 import geo_functions as gf
+import geo_store as gs
 
 # Definindo a página do Streamlit
 st.set_page_config(page_title="Sumário Estatítico", layout="wide")
@@ -10,13 +11,12 @@ st.set_page_config(page_title="Sumário Estatítico", layout="wide")
 # Função interna para consulta do IP
 st.title("Sumário Estatísticos dos Dados:")
 
-# Verifica se os dados estão no session_state (se já foram carregados)
-if 'df' not in st.session_state:
+# Verifica se há um dataset associado à sessão (se já foi carregado)
+df = gs.current_dataset()
+if df is None:
     st.warning("Por favor, faça o upload dos dados primeiro na página de [upload](upload).")
     st.stop()
 
-df = st.session_state.df
-
 # Exibe o sumário e a amostra dos dados
 st.header("Resumo dos Dados:")
 col1, col2, col3, col4 = st.columns([1.5,2.5,2,2])
@@ -37,7 +37,7 @@ nth = st.slider(
     step=10
 )
 
-# Contagem dos valores na combinação das colunas 'registrationID'
+# Ranking dos dispositivos em cache; o slider apenas recorta o ranking
 top_nth_registrationID = gf.top_nth_data(df, nth)
 
 bars_registrationID = (
@@ -60,29 +60,13 @@ col2_2.dataframe(top_nth_registrationID, hide_index=True)
 
 st.subheader("Mapa de calor:")
 
-# Create a mapping of English day names to Portuguese names
-days_portuguese = {
-    'Monday': 'Segunda-feira',
-    'Tuesday': 'Terça-feira',
-    'Wednesday': 'Quarta-feira',
-    'Thursday': 'Quinta-feira',
-    'Friday': 'Sexta-feira',
-    'Saturday': 'Sábado',
-    'Sunday': 'Domingo'
-}
-
-# Extracting the day of the week and hour in a single operation
-hm_df = df[['timestamp', 'registrationID']]
-hm_df['weekday'] = hm_df['timestamp'].dt.day_name().map(days_portuguese)
-hm_df['hour'] = hm_df['timestamp'].dt.hour  # Extract hour from timestamp
-
-# Prepare data for heat map by grouping by day of the week and hour, counting occurrences
-heat_map_data = hm_df.groupby(['weekday', 'hour']).size().reset_index(name='count')
+# Matriz dia da semana x hora calculada (e armazenada em cache) no geo_functions
+heat_map_data = gf.weekday_hour_counts(df)
 
 # Create heat map using Altair
 base = alt.Chart(heat_map_data, title="Mapa de Calor Anotado da Base de Dados").encode(
     alt.X("hour:O", title="Hora").axis(labelAngle=0),  # Use hour directly
-    alt.Y("weekday:O", title=None, sort=list(days_portuguese.values()))  # Sort weekdays
+    alt.Y("weekday:O", title=None, sort=gf.DAYS_PORTUGUESE)  # Sort weekdays
 )
 
 heatmap_text = base.mark_text(baseline='middle').encode(
@@ -128,7 +112,7 @@ bars_weekdays = (
     alt.Chart(heat_map_data)
     .mark_bar()
     .encode(
-        alt.X("weekday:O", title=None, sort=list(days_portuguese.values())),  # Ordenação manual dos dias
+        alt.X("weekday:O", title=None, sort=gf.DAYS_PORTUGUESE),  # Ordenação manual dos dias
         alt.Y("sum(count):Q", title="Contagem"),  # Usando 'sum(count)' para calcular a soma de ocorrências
         alt.Color("sum(count):Q",
                   scale=alt.Scale(scheme='reds'),
@@ -1,19 +1,21 @@
 import streamlit as st
-import pydeck as pdk
 import geo_functions as gf
+import geo_index as gi
+import geo_store as gs
+import geo_tiles as gt
+import geo_profiling as gp
 
 # Definindo a página do Streamlit
 st.set_page_config(page_title="Mapa Rápido", layout="wide", page_icon=":map:")
 
 st.title("Visualização do Mapa:")
 
-# Verifica se os dados estão no session_state (se já foram carregados)
-if 'df' not in st.session_state:
+# Verifica se há um dataset associado à sessão (se já foi carregado)
+df = gs.current_dataset()
+if df is None:
     st.warning("Por favor, faça o upload dos dados primeiro na página de [upload](upload).")
     st.stop()
 
-df = st.session_state.df
-
 # Sidebar para configurações do mapa
 with st.sidebar:
     st.subheader("Configurações do Mapa:")
@@ -60,8 +62,21 @@ with st.sidebar:
             default=df['registrationID'].unique()  # Todos os IDs selecionados por padrão
         )
 
+    # Área de visualização: apenas os pontos dentro da janela (com margem) são enviados ao mapa
+    df_view, view = gi.viewport_controls(df, gs.current_index())
+
+    # Tiles vetoriais: o mapa busca no servidor local apenas os tiles visíveis, já filtrados
+    tile_layer = gt.tile_controls()
+
+# Com tiles, os filtros seguem na URL e são aplicados pelo servidor de tiles (geo_tiles)
+if tile_layer is not None:
+    gt.tiles_chart(tile_layer, view, start_hour, end_hour, days_numbers,
+                   selected_registration_ids if filter_by_registrationID else None,
+                   map="Light", marker_size=max(marker_size // 20, 1))
+    st.stop()
+
 # Aplica os filtros aos dados
-filtered_data = gf.filter_data(df, start_hour, end_hour, days_numbers, selected_registration_ids)
+filtered_data = gf.filter_data(df_view, start_hour, end_hour, days_numbers, selected_registration_ids)
 
 # Se 'Colorir pontos' estiver ativado, usa a coluna 'markerColour'
 color_column = 'markerColour' if color_by_column else None
@@ -69,6 +84,7 @@ color_column = 'markerColour' if color_by_column else None
 # Exibe o mapa
 if not df.empty:
     st.info(f"Exibindo **{len(filtered_data)}** registros.")
-    st.map(filtered_data, size=marker_size, color=color_column)
+    with gp.measure('st_map', rows_in=len(filtered_data)):
+        st.map(filtered_data, size=marker_size, color=color_column, zoom=view.zoom if view is not None else None)
 else:
     st.write("Nenhum dado disponível para exibir.")
@@ -1,6 +1,14 @@
 import streamlit as st
 import pydeck as pdk
 import geo_functions as gf
+import geo_index as gi
+import geo_store as gs
+import geo_jobs as gj
+import geo_tiles as gt
+import geo_profiling as gp
+
+# Acima desta quantidade de registros o mapa de calor é preparado em segundo plano
+BACKGROUND_ROWS = 200_000
 
 # Definindo a página do Streamlit
 st.set_page_config(page_title="Mapa de Calor", layout="wide", page_icon=":map:")
@@ -15,12 +23,11 @@ with st.expander("Aviso", expanded=True):
     )
 
 # Verificar se o dataframe foi carregado
-if 'df' not in st.session_state:
+df = gs.current_dataset()
+if df is None:
     st.warning("Por favor, faça o upload dos dados primeiro.")
     st.stop()
 
-df = st.session_state.df
-
 # Sidebar para configurações do mapa
 with st.sidebar:
     st.subheader("Configurações do Mapa:")
@@ -30,6 +37,15 @@ with st.sidebar:
         ["Light", "Dark", "Streets", "Satellite", "Outdoors"], index=1
     )
 
+    # Tipo de visualização: calor dos pontos ou densidade exata por hexágono H3
+    view_mode = st.radio(
+        "Tipo de visualização:",
+        ['heatmap', 'hexagons'], horizontal=True,
+        format_func={'heatmap': "Calor", 'hexagons': "Hexágonos H3"}.get
+    )
+    if view_mode == 'hexagons':
+        max_res = st.slider("Resolução H3 máxima", 5, 15, 10)
+
     # Filtros de visualização
     st.subheader("Opções de Filtros de Visualização:")
 
@@ -51,16 +67,29 @@ with st.sidebar:
     # Mapeamento de dias da semana para números
     days_numbers = gf.map_days_to_numbers(selected_days)
 
-    # Filtro por registrationID
+    # Filtro por registrationID (ordenado pelo ranking de dispositivos em cache)
+    ranked_ids = gf.device_ranking(df)['registrationID'].tolist()
     selected_registration_ids = st.multiselect(
         "Selecione os dispositivos para plotar no mapa",
-        df['registrationID'].value_counts().sort_values(ascending=False).index.tolist(),
-        default=df['registrationID'].value_counts().sort_values(ascending=False).nlargest(200).index.tolist()  # Default para os 200 primeiros
+        ranked_ids,
+        default=ranked_ids[:200]  # Default para os 200 primeiros
     )
 
+    # Área de visualização: apenas os pontos dentro da janela (com margem) são enviados ao mapa
+    df_view, view = gi.viewport_controls(df, gs.current_index())
+
+    # Tiles vetoriais: o mapa busca no servidor local apenas os tiles visíveis, já filtrados
+    tile_layer = gt.tile_controls()
+
+# Com tiles, os filtros seguem na URL e são aplicados pelo servidor de tiles (geo_tiles)
+if tile_layer is not None:
+    gt.tiles_chart(tile_layer, view, start_hour, end_hour, days_numbers, selected_registration_ids,
+                   map=base_map, marker_size=3)
+    st.stop()
+
 # Aplicar filtros nos dados
 with st.spinner('Filtrando os dados...'):
-    filtered_data = gf.filter_data(df, start_hour, end_hour, days_numbers, selected_registration_ids)
+    filtered_data = gf.filter_data(df_view, start_hour, end_hour, days_numbers, selected_registration_ids)
 
 # Verifique se o dataframe filtrado contém dados válidos
 if filtered_data.empty:
@@ -69,11 +98,38 @@ if filtered_data.empty:
 
 # Criando o objeto Deck do pydeck
 try:
-    deck = gf.heatmap_render(filtered_data, map=base_map, opacity=0.8)
+    if view_mode == 'hexagons':
+        if view is None:
+            view = pdk.data_utils.compute_view(filtered_data[['longitude', 'latitude']])
+
+        # A resolução acompanha o zoom inicial da visualização; a troca conforme o zoom do mapa
+        # é feita pelos tiles de hexágonos (geo_tiles), a partir do rollup das contagens
+        display_res = min(gf.h3_resolution_for_zoom(view.zoom), max_res)
+        grouped_h3 = gf.groupby_h3(filtered_data, display_res)
+        st.caption(f"Resolução H3 exibida: **{display_res}** ({len(grouped_h3)} hexágonos). "
+                   "Para trocar a resolução conforme o zoom, use **Carregar em tiles (MVT)** com a camada Hexágonos.")
+        deck = gf.h3_render(grouped_h3, map=base_map, view=view)
+    elif len(filtered_data) > BACKGROUND_ROWS:
+        # Mapas grandes são preparados em segundo plano, sem bloquear a página nem reiniciar a cada interação
+        heatmap_job = gj.submit('heatmap', gf.heatmap_render, filtered_data, map=base_map, opacity=0.8, view=view)
+        heatmap_status = gj.status(heatmap_job)
+        if heatmap_status not in gj.FINISHED:
+            gj.job_status(heatmap_job.id, "Preparando o mapa de calor...")
+            st.stop()
+        if heatmap_status == gj.CANCELLED:
+            st.info("Preparação do mapa cancelada. Altere os filtros para tentar novamente.")
+            st.stop()
+        if heatmap_status == gj.FAILED:
+            raise heatmap_job.error
+        deck = heatmap_job.result
+    else:
+        deck = gf.heatmap_render(filtered_data, map=base_map, opacity=0.8, view=view)
 
     # Verificar se o objeto é uma instância de Deck válida
     if isinstance(deck, pdk.Deck):
-        st.pydeck_chart(deck)
+        # Mede a serialização do pydeck e o envio para o navegador
+        with gp.measure('pydeck_chart', rows_in=len(filtered_data)):
+            st.pydeck_chart(deck)
     else:
         st.error("O objeto gerado não é válido para exibição.")
 except Exception as e:
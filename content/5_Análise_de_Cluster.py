@@ -1,21 +1,21 @@
 import streamlit as st
 import pydeck as pdk
-import geopandas as gpd
 import geo_functions as gf
-from geopy.geocoders import Nominatim
-from sklearn.cluster import DBSCAN
+import geo_index as gi
+import geo_store as gs
+import geo_jobs as gj
+import geo_profiling as gp
 
 # Streamlit UI Setup
 st.set_page_config(page_title="Análise de Cluster", layout="wide", page_icon=":map:")
 
 st.title("Análise de Cluster")
 
-if 'df' not in st.session_state:
+df = gs.current_dataset()
+if df is None:
     st.warning("Por favor, faça o upload dos dados primeiro.")
     st.stop()
 
-df = st.session_state.df
-
 # Sidebar configurations
 with st.sidebar:
     st.subheader("Configurações do Mapa:")
@@ -34,12 +34,16 @@ with st.sidebar:
                                   ['Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira', 'Sexta-feira', 'Sábado', 'Domingo'],
                                   default=['Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira', 'Sexta-feira', 'Sábado', 'Domingo'])
     days_numbers = gf.map_days_to_numbers(selected_days)
+    ranked_ids = gf.device_ranking(df)['registrationID'].tolist()
     selected_registration_ids = st.multiselect("Selecione os dispositivos para plotar no mapa", 
-                                               df['registrationID'].value_counts().index.tolist(), 
-                                               default=df['registrationID'].value_counts().nlargest(50).index.tolist())
+                                               ranked_ids, 
+                                               default=ranked_ids[:50])
+
+    # Área de visualização: apenas os pontos dentro da janela (com margem) são enviados ao mapa
+    df_view, view = gi.viewport_controls(df, gs.current_index())
 
 # Apply filters
-filtered_data = gf.filter_data(df, start_hour, end_hour, days_numbers, selected_registration_ids)
+filtered_data = gf.filter_data(df_view, start_hour, end_hour, days_numbers, selected_registration_ids)
 
 if filtered_data.empty:
     st.warning("Nenhum dado disponível após aplicar os filtros.")
@@ -53,25 +57,22 @@ with col1:
 with col2:
     min_samples = st.number_input("Número mínimo de pontos em cada Cluster (min_samples)", min_value=1, value=10)
 
-# Verifica se já existe o estado em cache
-if 'dbscan_results' not in st.session_state:
-    try:
-        gdf = gf.to_gdf(filtered_data)
-        gdf_clusterizado, centroides = gf.apply_dbscan(gdf, eps, min_samples)
-
-        # Armazena o resultado no cache
-        st.session_state.dbscan_results = {
-            'gdf_clusterizado': gdf_clusterizado,
-            'centroides': centroides
-        }
-
-        st.success("DBSCAN aplicado com sucesso!")
-
-    except Exception as e:
-        st.error(f"Ocorreu um erro: {str(e)}")
+# Executa o DBSCAN em segundo plano; parâmetros iguais reaproveitam o job existente, inclusive de outras sessões.
+# Ao alterar os parâmetros, o job anterior da sessão é liberado (e interrompido se ninguém mais o aguarda)
+dbscan_job = gj.submit('dbscan', gf.cluster_analysis, filtered_data, eps, min_samples)
+dbscan_status = gj.status(dbscan_job)
+
+if dbscan_status not in gj.FINISHED:
+    gj.job_status(dbscan_job.id, "Aplicando DBSCAN...")
+elif dbscan_status == gj.FAILED:
+    st.error(f"Ocorreu um erro: {str(dbscan_job.error)}")
+elif dbscan_status == gj.CANCELLED:
+    st.info("DBSCAN cancelado.")
+    if st.button("Executar novamente"):
+        gj.submit('dbscan', gf.cluster_analysis, filtered_data, eps, min_samples, restart=True)
+        st.rerun()
 else:
-    gdf_clusterizado = st.session_state.dbscan_results['gdf_clusterizado']
-    centroides = st.session_state.dbscan_results['centroides']
+    gdf_clusterizado, centroides = dbscan_job.result
 
     # Gerar cores distintas para cada registrationID
     number_registrationIDs = len(gdf_clusterizado['registrationID'].unique())
@@ -108,9 +109,10 @@ else:
                                     get_fill_color=color_value, 
                                     pickable=True, opacity=0.4,))  # Adiciona a legenda com registrationID
 
-    # Set the initial view of the map
-    view = pdk.ViewState(latitude=gdf_clusterizado.geometry.y.mean(), 
-                         longitude=gdf_clusterizado.geometry.x.mean(), zoom=11)
+    # Set the initial view of the map (a área visível escolhida, quando ativada)
+    if view is None:
+        view = pdk.ViewState(latitude=gdf_clusterizado.geometry.y.mean(), 
+                             longitude=gdf_clusterizado.geometry.x.mean(), zoom=11)
 
     deck = pdk.Deck(layers=layers,
                     initial_view_state=view,
@@ -121,13 +123,16 @@ else:
                         }
                     }, map_style=pdk.map_styles.LIGHT
     )
-    st.pydeck_chart(deck)
+    with gp.measure('pydeck_chart', rows_in=len(gdf_clusterizado)):
+        st.pydeck_chart(deck)
 
     # Geocoding para o centroide
     st.subheader("Geocoding do Centroide do Cluster")
     st.write("Clique no botão abaixo para encontrar o endereço do ponto central de cada cluster:")
     if st.button("Geocodificar"):
         if not centroides.empty:
+            # Importação tardia: o geopy só é carregado quando a geocodificação é solicitada
+            from geopy.geocoders import Nominatim
             geolocator = Nominatim(user_agent="cluster_geocoder")
             first_cluster = centroides.iloc[0]
             location = geolocator.reverse((first_cluster['latitude'], first_cluster['longitude']), language='pt', timeout=10)
@@ -0,0 +1,77 @@
+import streamlit as st
+import geo_functions as gf
+import geo_store as gs
+import geo_profiling as gp
+
+# Definindo a página do Streamlit
+st.set_page_config(page_title="Trajetórias", layout="wide", page_icon=":map:")
+
+st.title("Trajetórias dos Dispositivos")
+
+# Verifica se há um dataset associado à sessão (se já foi carregado)
+df = gs.current_dataset()
+if df is None:
+    st.warning("Por favor, faça o upload dos dados primeiro na página de [upload](upload).")
+    st.stop()
+
+# Sidebar para configurações do mapa
+with st.sidebar:
+    st.subheader("Configurações do Mapa:")
+    base_map = st.selectbox(
+        "Opções de Mapa Base:",
+        ["Light", "Dark", "Streets", "Satellite", "Outdoors"], index=1
+    )
+
+    # TripsLayer anima o deslocamento ao longo do tempo; PathLayer exibe o caminho completo
+    animate = st.toggle("Animar trajetórias", value=False)
+
+    st.subheader("Opções de Filtros de Visualização:")
+    start_hour, end_hour = st.slider('Selecione o intervalo de horas', 0, 23, (0, 23), step=1)
+    selected_days = st.multiselect(
+        "Selecione os dias da semana",
+        gf.DAYS_PORTUGUESE,
+        default=gf.DAYS_PORTUGUESE
+    )
+    days_numbers = gf.map_days_to_numbers(selected_days)
+
+    ranked_ids = gf.device_ranking(df)['registrationID'].tolist()
+    selected_registration_ids = st.multiselect(
+        "Selecione os dispositivos para plotar no mapa",
+        ranked_ids,
+        default=ranked_ids[:10]  # Default para os 10 primeiros
+    )
+
+    st.subheader("Compressão das Trajetórias:")
+    tolerance_m = st.slider("Tolerância da simplificação (m)", 0, 200, 25, step=5)
+    jitter_m = st.slider("Distância mínima entre pontos (m)", 1, 100, 10)
+    stop_radius_m = st.slider("Raio de uma parada (m)", 10, 500, 50, step=10)
+    stop_minutes = st.slider("Duração mínima de uma parada (min)", 1, 120, 5)
+
+# Aplica os filtros aos dados
+filtered_data = gf.filter_data(df, start_hour, end_hour, days_numbers, selected_registration_ids)
+
+if filtered_data.empty:
+    st.warning("Nenhum dado disponível após aplicar os filtros.")
+    st.stop()
+
+# Trajetórias comprimidas (em cache) e paradas de cada dispositivo
+tracks, stops = gf.build_tracks(filtered_data, tolerance_m, jitter_m, stop_radius_m, stop_minutes)
+
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("**Dispositivos:**", value=len(tracks))
+col2.metric("**Pontos Originais:**", value=int(tracks['raw_points'].sum()))
+col3.metric("**Vértices Exibidos:**", value=int(tracks['points'].sum()))
+col4.metric("**Paradas:**", value=len(stops))
+
+current_time = None
+if animate:
+    # Instante da animação, em horas desde o primeiro registro filtrado
+    last_hour = max(max(timestamps[-1] for timestamps in tracks['timestamps']) / 3600, 1.0)
+    current_time = st.slider("Instante (horas desde o início)", 0.0, last_hour, last_hour, step=0.5) * 3600
+
+deck = gf.tracks_render(tracks, stops, map=base_map, animate=animate, current_time=current_time)
+with gp.measure('pydeck_chart', rows_in=int(tracks['points'].sum())):
+    st.pydeck_chart(deck)
+
+st.subheader("Paradas:")
+st.dataframe(stops, hide_index=True)
@@ -1,12 +1,24 @@
 import streamlit as st
+import geo_profiling as gp
 
 pg = st.navigation([
     st.Page("content/0_Home.py", icon=":material/home:", default=True),
     st.Page("content/1_Upload_de_Dados.py", url_path='upload', icon=":material/upload_file:"),
     st.Page("content/2_Sumário_Estatístico.py", url_path='statistics', icon=":material/analytics:"),
     st.Page("content/3_Mapa_Rápido.py", url_path='quickmap', icon=":material/map:"),
-    st.Page("content/4_Mapa_de_Calor.py", url_path='heatmap', icon=":material/mode_heat:")])
+    st.Page("content/4_Mapa_de_Calor.py", url_path='heatmap', icon=":material/mode_heat:"),
+    st.Page("content/6_Trajetórias.py", url_path='tracks', icon=":material/route:")])
     #st.Page("pages/5_Mapa_Interativo.py", icon=":material/globe:"),
     #st.Page("pages/6_Análise_de_Clusters.py",url_path='cluster', icon=":material/workspaces:"),
     #st.Page("pages/7_Análise_de_Provedores_Internet.py",url_path='isp', icon=":material/language:")  ])
-pg.run()
\ No newline at end of file
+
+# Log estruturado das etapas (GEOFOCUS_PROFILING_LOG: arquivo JSON lines ou '-' para stderr)
+gp.configure_logging()
+
+# Painel de diagnóstico renderizado antes da página: após um st.stop() nenhum elemento é mais
+# desenhado, então o painel (e seus toggles) ficaria de fora nas páginas que interrompem a execução
+gp.render_diagnostics()
+
+# A primeira execução do processo (partida a frio) inclui a importação dos módulos da página
+with gp.measure_run():
+    pg.run()
\ No newline at end of file
@@ -0,0 +1,58 @@
+"""
+Funções de análise geoespacial do GeoFocus.
+
+Os nomes são carregados sob demanda dos submódulos (ingest, hexagons, filters, summary,
+render, clustering, export, tracks). Bibliotecas pesadas (geopandas/GDAL, scikit-learn,
+pydeck, h3) são importadas apenas dentro das funções que as usam, de modo que páginas
+como Home e Upload não pagam por elas na inicialização.
+"""
+import importlib
+
+# Nome público -> submódulo que o define
+_SUBMODULES = {
+    'load_data': 'ingest',
+    'INTERNAL_COLUMNS': 'ingest',
+    'add_h3': 'hexagons',
+    'groupby_h3': 'hexagons',
+    'h3_rollup': 'hexagons',
+    'h3_resolution_for_zoom': 'hexagons',
+    'H3_RESOLUTIONS': 'hexagons',
+    'DAYS_PORTUGUESE': 'filters',
+    'map_days_to_numbers': 'filters',
+    'filter_data': 'filters',
+    'weekhour_mask': 'filters',
+    'clip_to_bbox': 'filters',
+    'device_ranking': 'summary',
+    'top_nth_data': 'summary',
+    'weekday_hour_counts': 'summary',
+    'MAPBOX_STYLES': 'render',
+    'count_color_expression': 'render',
+    'heatmap_render': 'render',
+    'h3_render': 'render',
+    'tiles_render': 'render',
+    'tracks_render': 'render',
+    'gen_colors': 'render',
+    'to_gdf': 'clustering',
+    'apply_dbscan': 'clustering',
+    'cluster_analysis': 'clustering',
+    'export_csv': 'export',
+    'export_kml': 'export',
+    'export_files': 'export',
+    'EARTH_RADIUS_M': 'tracks',
+    'build_tracks': 'tracks',
+}
+
+__all__ = sorted(_SUBMODULES)
+
+
+def __getattr__(name):
+    submodule = _SUBMODULES.get(name)
+    if submodule is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{submodule}', __name__), name)
+    globals()[name] = value  # As próximas consultas não passam mais por aqui
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_SUBMODULES))
@@ -0,0 +1,41 @@
+from io import BytesIO
+
+import geo_profiling as gp
+from .ingest import INTERNAL_COLUMNS
+
+# Função para exportar DataFrame como CSV e armazenar em cache
+@gp.cached_stage(ttl='1d')
+def export_csv(df):
+    return df.to_csv(index=False)
+
+# Função para exportar DataFrame como KML e armazenar em cache
+@gp.cached_stage(ttl='1d')
+def export_kml(df):
+    # Importação tardia: geopandas/GDAL só são carregados quando a exportação KML é usada
+    import geopandas as gpd
+
+    # Converte DataFrame para GeoDataFrame
+    gdf = gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df['longitude'], df['latitude']))
+    gdf = gdf.set_crs('EPSG:4326')  # Define o CRS como WGS84
+    
+    # Usando BytesIO para gerar o KML em memória
+    kml_buffer = BytesIO()
+    gdf.to_file(kml_buffer, driver='KML')
+    
+    # Retorna o conteúdo do KML como bytes para download
+    kml_buffer.seek(0)  # Volta para o início do buffer
+    return kml_buffer.read()
+
+# Função para exportar CSV e KML de uma vez, executada como job em segundo plano
+def export_files(df, progress=None):
+    # Exporta apenas as colunas do dataset original (e as de H3), sem as colunas internas
+    df = df.drop(columns=INTERNAL_COLUMNS, errors='ignore')
+    if progress is not None:
+        progress(0.0)  # Permite cancelar antes de iniciar
+    csv_data = export_csv(df)
+    if progress is not None:
+        progress(0.3)
+    kml_data = export_kml(df)
+    if progress is not None:
+        progress(1.0)
+    return csv_data, kml_data
@@ -0,0 +1,54 @@
+import streamlit as st
+import numpy as np
+
+import geo_profiling as gp
+
+# Nomes dos dias da semana na ordem de pandas (segunda-feira = 0)
+DAYS_PORTUGUESE = ['Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira', 'Sexta-feira', 'Sábado', 'Domingo']
+
+# Função para mapear dias da semana para números
+@st.cache_data(ttl='1d')
+def map_days_to_numbers(days):
+    days_map = {
+        'Segunda-feira': 0,
+        'Terça-feira': 1,
+        'Quarta-feira': 2,
+        'Quinta-feira': 3,
+        'Sexta-feira': 4,
+        'Sábado': 5,
+        'Domingo': 6
+    }
+    return [days_map[day] for day in days]
+
+# Função para filtrar os dados
+@gp.cached_stage(ttl='1d')
+def filter_data(df, start_hour=0, end_hour=23, days_numbers=None, selected_registration_ids=None):
+    if days_numbers is None:
+        days_numbers = [0, 1, 2, 3, 4, 5, 6]  # Todos os dias da semana
+    if selected_registration_ids is None:
+        selected_registration_ids = df['registrationID'].unique()  # Todos os IDs
+
+    # Filtro por intervalo de horas
+    df = df[(df['timestamp'].dt.hour >= start_hour) & (df['timestamp'].dt.hour <= end_hour)]
+    
+    # Filtro por dia da semana
+    df = df[df['timestamp'].dt.weekday.isin(days_numbers)]
+    
+    # Filtro por registrationID
+    df = df[df['registrationID'].isin(selected_registration_ids)]
+    
+    return df
+
+# Tabela com os 168 códigos 'weekhour' aceitos pelos filtros de hora e dia da semana
+def weekhour_mask(start_hour=0, end_hour=23, days_numbers=None):
+    if days_numbers is None:
+        days_numbers = [0, 1, 2, 3, 4, 5, 6]  # Todos os dias da semana
+    hours = np.arange(24)
+    allowed = np.zeros((7, 24), dtype=bool)
+    allowed[list(days_numbers)] = (hours >= start_hour) & (hours <= end_hour)
+    return allowed.ravel()
+
+@gp.stage
+def clip_to_bbox(df, index, bbox):
+    # Seleciona, via índice espacial, apenas as linhas dentro do retângulo (lon_min, lat_min, lon_max, lat_max)
+    return df.iloc[index.query(bbox)]
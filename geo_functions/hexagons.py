@@ -0,0 +1,72 @@
+import numpy as np
+
+import geo_profiling as gp
+
+@gp.stage
+def add_h3(df):
+    # Função para converter lat/lng para H3 e adicionar colunas de diferentes resoluções
+    import h3
+
+    resolutions = range(5, 16)
+
+    # Pre-calculate H3 cells for all rows at resolution 15
+    h3_cells_15 = np.vectorize(lambda lat, lng: h3.latlng_to_cell(lat, lng, res=15))(df['latitude'], df['longitude'])
+    
+    # Compute and assign H3 cells for all resolutions in ascending order
+    for res in resolutions:  # Iterate from 10 to 15
+        if res == 15:
+            df[f'h3_res_{res}'] = h3_cells_15  # Assign directly for resolution 15
+        else:
+            df[f'h3_res_{res}'] = np.vectorize(lambda cell: h3.cell_to_parent(cell, res))(h3_cells_15)
+
+    return df
+    
+@gp.cached_stage(ttl='1d')
+def groupby_h3(df, h3_grid=10):
+    # Contagem das ocorrências para a coluna de H3 e depois dos registros
+    h3_column = f'h3_res_{h3_grid}'
+
+    grouped_h3 = (
+        df.groupby([h3_column])
+        .size()
+        .reset_index(name='count')
+    )
+    
+    # Renomeia as colunas para 'hex' e 'count'
+    grouped_h3 = grouped_h3.rename(columns={h3_column: 'hex'})
+    
+    return grouped_h3.sort_values(by='count', ascending=False)
+
+@gp.stage
+def h3_rollup(grouped_h3, finest_res, coarsest_res=5):
+    # Deriva as contagens das resoluções mais grossas somando os filhos em seus pais, nível a nível,
+    # a partir da contagem da resolução mais fina (colunas 'hex' e 'count'), sem reagrupar as linhas brutas.
+    # Sem st.cache_data: o servidor de tiles mantém os níveis em cache por dataset e filtro
+    import h3
+
+    levels = {finest_res: grouped_h3[['hex', 'count']].reset_index(drop=True)}
+    for res in range(finest_res - 1, coarsest_res - 1, -1):
+        children = levels[res + 1]
+        parents = [h3.cell_to_parent(cell, res) for cell in children['hex']]
+        levels[res] = (
+            children.groupby(parents)['count']
+            .sum()
+            .rename_axis('hex')
+            .reset_index()
+            .sort_values(by='count', ascending=False, ignore_index=True)
+        )
+    return levels
+
+# Resoluções H3 disponíveis no dataset (colunas 'h3_res_N' criadas por add_h3)
+H3_RESOLUTIONS = range(5, 16)
+
+def h3_resolution_for_zoom(zoom, hex_pixels=12):
+    # Escolhe a resolução H3 cujo hexágono ocupa aproximadamente 'hex_pixels' pixels no zoom informado
+    import h3
+
+    meters_per_pixel = 40075016.686 / (256 * 2 ** zoom)
+    target_edge_km = hex_pixels * meters_per_pixel / 1000 / 2
+    for res in H3_RESOLUTIONS:
+        if h3.average_hexagon_edge_length(res, unit='km') <= target_edge_km:
+            return res
+    return H3_RESOLUTIONS[-1]
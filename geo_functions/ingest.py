@@ -0,0 +1,38 @@
+import json
+
+import pandas as pd
+
+import geo_profiling as gp
+
+# Colunas derivadas para uso interno (sumários e filtros), fora das exportações e das amostras
+INTERNAL_COLUMNS = ['weekhour']
+
+# Função para processar os JSON gerados pelo Infinity
+# Sem st.cache_data: o resultado é mantido uma única vez no geo_store, compartilhado entre sessões
+@gp.stage
+def load_data(uploaded_files):
+    dataframes = []
+    
+    for uploaded_file in uploaded_files:
+        dadosBrutos = json.load(uploaded_file)
+        
+        signals = [
+            signal
+            for key in dadosBrutos
+            for signal in dadosBrutos[key]['response'].get('signals', [])
+        ]
+        
+        if signals:
+            df = pd.DataFrame(signals)
+            dataframes.append(df)
+
+    df = pd.concat(dataframes, ignore_index=True) if dataframes else pd.DataFrame()
+
+    df = df[["timestamp", "registrationID", "ipAddress", "latitude", "longitude", "markerColour"]]
+    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+    df = df.sort_values(by='timestamp', ignore_index=True)
+    df = df.drop_duplicates()
+    # Código inteiro dia da semana * 24 + hora (0 a 167), usado pelos sumários e filtros
+    df["weekhour"] = (df["timestamp"].dt.weekday * 24 + df["timestamp"].dt.hour).astype("uint8")
+
+    return df
@@ -0,0 +1,193 @@
+import geo_profiling as gp
+
+MAPBOX_STYLES = {
+    "Light": "mapbox://styles/mapbox/light-v10",
+    "Dark": "mapbox://styles/mapbox/dark-v10",
+    "Streets": "mapbox://styles/mapbox/streets-v11",
+    "Outdoors": "mapbox://styles/mapbox/outdoors-v11",
+    "Satellite": "mapbox://styles/mapbox/satellite-v9"
+}
+
+# Cor por faixa de contagem, avaliada no navegador para cada feição
+def count_color_expression(accessor="count", thresholds=(10, 100, 1000)):
+    low, mid, high = thresholds
+    return (
+        f"@@={accessor} > {high} ? [189, 0, 38, 200] : "
+        f"{accessor} > {mid} ? [240, 59, 32, 200] : "
+        f"{accessor} > {low} ? [253, 141, 60, 200] : [254, 204, 92, 200]"
+    )
+
+@gp.stage
+def heatmap_render(df, map="light", opacity=0.5, view=None):
+    import pydeck as pdk
+
+    # Verificar se o DataFrame contém as colunas de latitude e longitude (em várias variações)
+    lat_col = None
+    lon_col = None
+    possible_lat_names = ['latitude', 'lat', 'Lat']
+    possible_lon_names = ['longitude', 'lng', 'Lng']
+
+    # Procurar as colunas correspondentes no DataFrame
+    for col in possible_lat_names:
+        if col in df.columns:
+            lat_col = col
+            break
+    for col in possible_lon_names:
+        if col in df.columns:
+            lon_col = col
+            break
+
+    # Se não encontrar as colunas de latitude e longitude, retornar um erro
+    if lat_col is None or lon_col is None:
+        raise ValueError("O DataFrame não contém colunas válidas de latitude e longitude. Verifique os nomes das colunas.")
+
+    # Agrupar os dados por latitude e longitude e gerar a coluna 'count' com a contagem de ocorrências
+    df_grouped = df.groupby([lat_col, lon_col]).size().reset_index(name='count')
+
+    # Preparar a camada pydeck para o mapa
+    layer = pdk.Layer(
+        "HeatmapLayer",  # Tipo de camada para mapa de calor
+        df_grouped,  # Dados agrupados
+        opacity=opacity,
+        get_position=[lon_col, lat_col],  # Usar as colunas encontradas de longitude e latitude
+        get_weight="count",  # Usar a coluna 'count' como peso para a intensidade do mapa de calor
+    )
+
+    # Definir a visualização do mapa (view state), se não for informada
+    if view is None:
+        view = pdk.data_utils.compute_view(df_grouped[[lon_col, lat_col]])
+
+    # Renderizar o mapa com a camada e o estilo selecionado
+    deck = pdk.Deck(
+        layers=[layer],
+        initial_view_state=view,
+        map_style=MAPBOX_STYLES[map])  # A URL do estilo selecionado
+    
+
+    # Exibir o mapa no Streamlit
+    return deck
+
+@gp.stage
+def h3_render(grouped_h3, map="Dark", view=None, opacity=0.6):
+    import pydeck as pdk
+
+    # Mapa de densidade exato: uma feição por hexágono, independentemente da quantidade de linhas
+    thresholds = grouped_h3['count'].quantile([0.5, 0.75, 0.9]).round().astype(int).tolist()
+
+    layer = pdk.Layer(
+        "H3HexagonLayer",
+        grouped_h3,
+        get_hexagon="hex",
+        get_fill_color=count_color_expression("count", thresholds),
+        get_line_color=[255, 255, 255, 60],
+        line_width_min_pixels=1,
+        extruded=False,
+        opacity=opacity,
+        pickable=True,
+    )
+
+    deck = pdk.Deck(
+        layers=[layer],
+        initial_view_state=view,
+        tooltip={'html': '<b>Hexágono:</b> {hex}<br/><b>Total:</b> {count}'},
+        map_style=MAPBOX_STYLES[map])
+
+    return deck
+
+def tiles_render(url, layer="points", map="Dark", view=None, marker_size=3):
+    import pydeck as pdk
+
+    # Hexágonos da borda aparecem em vários tiles: 'hex' identifica as cópias do mesmo hexágono
+    unique_id = {'unique_id_property': "hex"} if layer == "hexagons" else {}
+
+    # Camada MVT: o navegador busca apenas os tiles visíveis no zoom atual (ver geo_tiles)
+    mvt_layer = pdk.Layer(
+        "MVTLayer",
+        data=url,
+        min_zoom=0,
+        max_zoom=16,
+        get_fill_color=count_color_expression("properties.count"),
+        get_line_color=[255, 255, 255, 60],
+        line_width_min_pixels=0 if layer == "points" else 1,
+        point_radius_units="pixels",
+        get_point_radius=marker_size,
+        pickable=True,
+        **unique_id,
+    )
+
+    deck = pdk.Deck(
+        layers=[mvt_layer],
+        initial_view_state=view,
+        tooltip={'html': '<b>Total:</b> {count}'},
+        map_style=MAPBOX_STYLES[map])
+
+    return deck
+
+@gp.stage
+def tracks_render(tracks, stops, map="Dark", view=None, width=3, animate=False, current_time=None, trail_length=3600):
+    import pydeck as pdk
+
+    # Cor única para cada dispositivo
+    colors = gen_colors(max(len(tracks), 1))
+    tracks = tracks.assign(color=colors[:len(tracks)])
+
+    if animate:
+        # TripsLayer: exibe a parte de cada trajetória percorrida até 'current_time' (segundos)
+        track_layer = pdk.Layer(
+            "TripsLayer",
+            tracks,
+            get_path="path",
+            get_timestamps="timestamps",
+            get_color="color",
+            width_min_pixels=width,
+            trail_length=trail_length,
+            current_time=current_time,
+            pickable=True,
+        )
+    else:
+        track_layer = pdk.Layer(
+            "PathLayer",
+            tracks,
+            get_path="path",
+            get_color="color",
+            width_min_pixels=width,
+            pickable=True,
+        )
+
+    stop_layer = pdk.Layer(
+        "ScatterplotLayer",
+        stops,
+        get_position=["longitude", "latitude"],
+        get_fill_color=[255, 255, 0, 200],
+        radius_min_pixels=4,
+        pickable=True,
+    )
+
+    if view is None:
+        view = pdk.data_utils.compute_view([point for path in tracks['path'] for point in path[::10]])
+
+    deck = pdk.Deck(
+        layers=[track_layer, stop_layer],
+        initial_view_state=view,
+        tooltip={'html': '<b>ID:</b> {registrationID}'},
+        map_style=MAPBOX_STYLES[map])
+
+    return deck
+
+# Função para gerar cores distintas
+def gen_colors(n):
+    """
+    Gera n cores distintas no formato RGB.
+    Cada cor será uma combinação única de Red, Green e Blue.
+    """
+    colors = []
+    step = 255 // n  # Dividimos o intervalo 0-255 em n partes
+
+    for i in range(n):
+        # A cada i, a cor muda nas três componentes RGB
+        red = (i * step) % 255
+        green = ((i * 2 * step) + 85) % 255  # Deslocamento para garantir uma variação mais ampla
+        blue = ((i * 3 * step) + 170) % 255  # Outro deslocamento
+        colors.append([red, green, blue])  # Adiciona a cor gerada à lista
+    
+    return colors
@@ -0,0 +1,37 @@
+import pandas as pd
+import numpy as np
+
+import geo_profiling as gp
+from .filters import DAYS_PORTUGUESE
+
+@gp.cached_stage(ttl='1d')
+def device_ranking(df):
+    # Contagem de registros por registrationID, calculada uma única vez por dataset
+    ranking = (
+        df.groupby(['registrationID'])
+        .size()
+        .reset_index(name='count')
+    )
+
+    return ranking.sort_values(by='count', ascending=False, kind='stable', ignore_index=True)
+
+@gp.stage
+def top_nth_data(df, nth=50):
+    # Get the top 'nth' registrationIDs slicing the cached ranking
+    return device_ranking(df).head(nth)
+
+@gp.cached_stage(ttl='1d')
+def weekday_hour_counts(df):
+    # Matriz 7x24 de registros por dia da semana e hora, com um único bincount sobre os códigos 'weekhour'
+    if 'weekhour' in df.columns:
+        codes = df['weekhour'].to_numpy()
+    else:
+        codes = df['timestamp'].dt.weekday.to_numpy() * 24 + df['timestamp'].dt.hour.to_numpy()
+    counts = np.bincount(codes, minlength=7 * 24)
+
+    # Os nomes em português são aplicados apenas às 168 células do resultado
+    return pd.DataFrame({
+        'weekday': np.repeat(DAYS_PORTUGUESE, 24),
+        'hour': np.tile(np.arange(24), 7),
+        'count': counts,
+    })
@@ -0,0 +1,154 @@
+import pandas as pd
+import numpy as np
+
+import geo_profiling as gp
+
+# Raio médio da Terra (m), usado na projeção local das trajetórias
+EARTH_RADIUS_M = 6371008.8
+
+def _simplify_sed(x, y, t, tolerance, keep):
+    """
+    Douglas-Peucker sensível ao tempo (distância euclidiana sincronizada).
+
+    Cada ponto é comparado à posição interpolada no mesmo instante ao longo do segmento,
+    o que preserva velocidade e horários da trajetória. Os pontos marcados em 'keep'
+    (extremidades e paradas) são sempre mantidos. Retorna a máscara dos pontos mantidos.
+    """
+    keep = keep.copy()
+    keep[0] = keep[-1] = True
+    anchors = np.flatnonzero(keep)
+    stack = list(zip(anchors[:-1], anchors[1:]))
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        inner = slice(i + 1, j)
+        duration = t[j] - t[i]
+        ratio = (t[inner] - t[i]) / duration if duration > 0 else np.zeros(j - i - 1)
+        distance = np.hypot(x[inner] - (x[i] + (x[j] - x[i]) * ratio), y[inner] - (y[i] + (y[j] - y[i]) * ratio))
+        k = int(np.argmax(distance))
+        if distance[k] > tolerance:
+            m = i + 1 + k
+            keep[m] = True
+            stack += [(i, m), (m, j)]
+    return keep
+
+def _window_max(values, starts, ends):
+    # Máximo de values[start:end + 1] em cada janela, combinando blocos de 2^k pontos (tabela esparsa)
+    result = np.empty(len(starts))
+    if not len(starts):
+        return result
+    levels = np.log2(ends - starts + 1).astype('int64')
+    level = values
+    for k in range(int(levels.max()) + 1):
+        span = 1 << k
+        selected = levels == k
+        result[selected] = np.maximum(level[starts[selected]], level[ends[selected] - span + 1])
+        level = np.maximum(level[:-span], level[span:])  # Blocos de 2^(k+1) pontos
+    return result
+
+def _all_within(x, y, starts, ends, radius, chunk=1_000_000):
+    # Verificação exata, ponto a ponto, de que cada janela fica a até 'radius' metros do seu início
+    result = np.zeros(len(starts), dtype=bool)
+    lengths = ends - starts + 1
+    splits = np.searchsorted(np.cumsum(lengths), np.arange(chunk, lengths.sum(), chunk))
+    for block in np.split(np.arange(len(starts)), splits):
+        if not len(block):
+            continue
+        block_starts, block_lengths = starts[block], lengths[block]
+        owner = np.repeat(np.arange(len(block)), block_lengths)
+        positions = np.repeat(block_starts - np.cumsum(block_lengths) + block_lengths, block_lengths) + np.arange(block_lengths.sum())
+        far = np.hypot(x[positions] - x[block_starts][owner], y[positions] - y[block_starts][owner]) > radius
+        result[block] = np.bincount(owner[far], minlength=len(block)) == 0
+    return result
+
+def _stationary_runs(x, y, t, radius, seconds):
+    # Trechos em que o dispositivo fica, por pelo menos 'seconds', a menos de 'radius' metros do ponto
+    # inicial; todos os pontos do intervalo são considerados, e não apenas o último (ida e volta não é parada)
+    n = len(t)
+    later = np.searchsorted(t, t + seconds, side='left')
+    anchors = np.flatnonzero(later < n)
+    ends = later[anchors]
+
+    # Maior afastamento do ponto inicial em cada eixo, sobre toda a janela
+    dx = np.maximum(_window_max(x, anchors, ends) - x[anchors], x[anchors] + _window_max(-x, anchors, ends))
+    dy = np.maximum(_window_max(y, anchors, ends) - y[anchors], y[anchors] + _window_max(-y, anchors, ends))
+
+    # Caixa envolvente dentro do raio: parada; algum eixo fora do raio: não é parada; demais casos: verificação exata
+    valid = np.hypot(dx, dy) <= radius
+    doubtful = ~valid & (dx <= radius) & (dy <= radius)
+    valid[doubtful] = _all_within(x, y, anchors[doubtful], ends[doubtful], radius)
+    anchors, ends = anchors[valid], ends[valid]
+
+    # Marca todos os pontos entre cada âncora e o ponto correspondente 'seconds' depois
+    coverage = np.zeros(n + 1, dtype='int64')
+    np.add.at(coverage, anchors, 1)
+    np.add.at(coverage, ends + 1, -1)
+    stationary = np.cumsum(coverage[:n]) > 0
+
+    edges = np.diff(np.r_[0, stationary.astype('int8'), 0])
+    return stationary, np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
+
+@gp.cached_stage(ttl='1d')
+def build_tracks(df, tolerance_m=25.0, jitter_m=10.0, stop_radius_m=50.0, stop_minutes=5):
+    """
+    Monta e comprime as trajetórias de cada dispositivo a partir dos sinais ordenados no tempo.
+
+    Parâmetros:
+    df (DataFrame): Sinais com 'timestamp', 'registrationID', 'latitude' e 'longitude'.
+    tolerance_m (float): Desvio máximo (m) admitido na simplificação.
+    jitter_m (float): Pontos consecutivos na mesma célula de 'jitter_m' metros são agrupados.
+    stop_radius_m (float): Deslocamento máximo (m) para considerar o dispositivo parado.
+    stop_minutes (float): Permanência mínima (min) para registrar uma parada.
+
+    Retorna:
+    tuple: DataFrame das trajetórias (um caminho por dispositivo) e DataFrame das paradas.
+    """
+    df = df.sort_values(by='timestamp', kind='stable')
+    t_all = (df['timestamp'] - df['timestamp'].min()).dt.total_seconds().to_numpy()
+    lat_all = df['latitude'].to_numpy()
+    lon_all = df['longitude'].to_numpy()
+
+    # Projeção equiretangular local em metros, suficiente para as distâncias envolvidas
+    cos_lat = np.cos(np.radians(np.nanmean(lat_all))) if len(df) else 1.0
+    x_all = np.radians(lon_all) * EARTH_RADIUS_M * cos_lat
+    y_all = np.radians(lat_all) * EARTH_RADIUS_M
+
+    tracks, stops = [], []
+    for reg_id, positions in df.groupby('registrationID', sort=False).indices.items():
+        x, y, t = x_all[positions], y_all[positions], t_all[positions]
+        lat, lon = lat_all[positions], lon_all[positions]
+
+        # Paradas: mantêm apenas a chegada e a saída; os pontos intermediários são ruído
+        stationary, stop_starts, stop_ends = _stationary_runs(x, y, t, stop_radius_m, stop_minutes * 60)
+
+        # Remoção de ruído: sequências consecutivas na mesma célula viram um único ponto
+        cell_x = np.floor(x / jitter_m)
+        cell_y = np.floor(y / jitter_m)
+        candidate = np.r_[True, (cell_x[1:] != cell_x[:-1]) | (cell_y[1:] != cell_y[:-1])] & ~stationary
+        candidate[stop_starts] = candidate[stop_ends] = True
+        candidate[-1] = True
+        candidates = np.flatnonzero(candidate)
+        forced = np.isin(candidates, np.r_[stop_starts, stop_ends])
+
+        kept = candidates[_simplify_sed(x[candidates], y[candidates], t[candidates], tolerance_m, forced)]
+
+        tracks.append({
+            'registrationID': reg_id,
+            'path': np.column_stack((lon[kept], lat[kept])).tolist(),
+            'timestamps': t[kept].tolist(),
+            'raw_points': len(positions),
+            'points': len(kept),
+        })
+        for start, end in zip(stop_starts, stop_ends):
+            stops.append({
+                'registrationID': reg_id,
+                'latitude': lat[start:end + 1].mean(),
+                'longitude': lon[start:end + 1].mean(),
+                'start': df['timestamp'].iat[positions[start]],
+                'end': df['timestamp'].iat[positions[end]],
+                'minutes': round((t[end] - t[start]) / 60, 1),
+            })
+
+    columns = ['registrationID', 'latitude', 'longitude', 'start', 'end', 'minutes']
+    return pd.DataFrame(tracks), pd.DataFrame(stops, columns=columns)
@@ -0,0 +1,139 @@
+import math
+
+import numpy as np
+import streamlit as st
+
+import geo_functions as gf
+
+# Tamanho do mapa do mundo em pixels no zoom 0 (Web Mercator, como no deck.gl/Mapbox)
+TILE_SIZE = 256
+
+# Dimensões aproximadas (px) do mapa exibido nas páginas, usadas para estimar a área visível
+VIEWPORT_WIDTH = 1200
+VIEWPORT_HEIGHT = 700
+
+
+class SpatialIndex:
+    """
+    Índice espacial de grade ordenada sobre latitude/longitude.
+
+    Cada ponto recebe a chave linha * grid_size + coluna de uma grade regular sobre a
+    extensão dos dados, e as posições das linhas são ordenadas por essa chave. Uma
+    consulta por retângulo faz duas buscas binárias por linha da grade coberta e só
+    então verifica as coordenadas exatas dos candidatos, sem percorrer todo o dataset.
+    """
+
+    def __init__(self, latitude, longitude, grid_size=1024):
+        self.latitude = np.asarray(latitude, dtype='float64')
+        self.longitude = np.asarray(longitude, dtype='float64')
+        self.grid_size = grid_size
+        self.size = len(self.latitude)
+
+        if self.size:
+            self.lat_min, self.lat_max = float(self.latitude.min()), float(self.latitude.max())
+            self.lon_min, self.lon_max = float(self.longitude.min()), float(self.longitude.max())
+        else:
+            self.lat_min = self.lat_max = self.lon_min = self.lon_max = 0.0
+
+        rows = self._cell(self.latitude, self.lat_min, self.lat_max)
+        cols = self._cell(self.longitude, self.lon_min, self.lon_max)
+        keys = rows.astype('int64') * grid_size + cols
+
+        self.order = np.argsort(keys, kind='stable')
+        self.keys = keys[self.order]
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(df['latitude'].to_numpy(), df['longitude'].to_numpy())
+
+    @property
+    def nbytes(self):
+        # Coordenadas, ordem e chaves: cerca de 32 bytes por linha
+        return self.latitude.nbytes + self.longitude.nbytes + self.order.nbytes + self.keys.nbytes
+
+    def _cell(self, values, vmin, vmax):
+        span = (vmax - vmin) or 1.0
+        cells = ((np.asarray(values, dtype='float64') - vmin) / span * self.grid_size).astype('int64')
+        return np.clip(cells, 0, self.grid_size - 1)
+
+    def query(self, bbox):
+        """
+        Retorna as posições (ordenadas) das linhas dentro de bbox = (lon_min, lat_min, lon_max, lat_max).
+        """
+        lon_min, lat_min, lon_max, lat_max = bbox
+        if (not self.size or lon_min > self.lon_max or lon_max < self.lon_min
+                or lat_min > self.lat_max or lat_max < self.lat_min):
+            return np.empty(0, dtype='int64')
+
+        # Retângulo cobrindo toda a extensão dos dados: dispensa a consulta
+        if lon_min <= self.lon_min and lon_max >= self.lon_max and lat_min <= self.lat_min and lat_max >= self.lat_max:
+            return np.arange(self.size)
+
+        row0, row1 = self._cell([lat_min, lat_max], self.lat_min, self.lat_max)
+        col0, col1 = self._cell([lon_min, lon_max], self.lon_min, self.lon_max)
+
+        # Um intervalo contíguo de chaves por linha da grade
+        row_keys = np.arange(row0, row1 + 1, dtype='int64') * self.grid_size
+        starts = np.searchsorted(self.keys, row_keys + col0, side='left')
+        ends = np.searchsorted(self.keys, row_keys + col1, side='right')
+
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.empty(0, dtype='int64')
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        candidates = self.order[offsets + np.arange(total)]
+
+        # Verificação exata para as células da borda do retângulo
+        lat = self.latitude[candidates]
+        lon = self.longitude[candidates]
+        inside = (lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)
+        return np.sort(candidates[inside])
+
+
+def viewport_bbox(latitude, longitude, zoom, margin=0.25, width=VIEWPORT_WIDTH, height=VIEWPORT_HEIGHT):
+    """
+    Estima o retângulo (lon_min, lat_min, lon_max, lat_max) visível em um mapa Web Mercator
+    centrado em (latitude, longitude) no nível de zoom indicado, ampliado pela margem.
+    """
+    world = TILE_SIZE * 2 ** zoom
+    half_w = width * (1 + margin) / 2
+    half_h = height * (1 + margin) / 2
+
+    # Coordenadas do centro em pixels do mundo
+    x = (longitude + 180) / 360 * world
+    sin_lat = math.sin(math.radians(max(min(latitude, 85.0511), -85.0511)))
+    y = (0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * world
+
+    def to_lat(py):
+        n = math.pi - 2 * math.pi * py / world
+        return math.degrees(math.atan(math.sinh(n)))
+
+    lon_min = max((x - half_w) / world * 360 - 180, -180.0)
+    lon_max = min((x + half_w) / world * 360 - 180, 180.0)
+    lat_max = to_lat(max(y - half_h, 0))
+    lat_min = to_lat(min(y + half_h, world))
+    return lon_min, lat_min, lon_max, lat_max
+
+
+def viewport_controls(df, spatial_index, default_zoom=12):
+    """
+    Controles da área de visualização, para uso na barra lateral das páginas de mapa.
+
+    Retorna (df_view, view): com a opção ativada, apenas as linhas dentro da janela
+    estimada (com margem) e o pdk.ViewState correspondente; caso contrário, (df, None).
+    """
+    import pydeck as pdk
+
+    st.subheader("Área de Visualização:")
+    if not st.toggle("Enviar apenas a área visível", value=False):
+        return df, None
+
+    center_lat = st.number_input("Latitude do centro", -90.0, 90.0,
+                                 (spatial_index.lat_min + spatial_index.lat_max) / 2, format="%.5f")
+    center_lon = st.number_input("Longitude do centro", -180.0, 180.0,
+                                 (spatial_index.lon_min + spatial_index.lon_max) / 2, format="%.5f")
+    zoom = st.slider("Zoom", 1, 20, default_zoom)
+
+    df_view = gf.clip_to_bbox(df, spatial_index, viewport_bbox(center_lat, center_lon, zoom))
+    return df_view, pdk.ViewState(latitude=center_lat, longitude=center_lon, zoom=zoom)
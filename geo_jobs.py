@@ -0,0 +1,242 @@
+import hashlib
+import inspect
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import streamlit as st
+
+try:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError:
+    get_script_run_ctx = lambda suppress_warning=False: None
+
+# Quantidade de análises executadas em paralelo no processo
+MAX_WORKERS = int(os.environ.get('GEOFOCUS_JOB_WORKERS', 2))
+
+# Tempo (s) que o resultado de um job concluído permanece disponível
+JOB_TTL_SECONDS = int(os.environ.get('GEOFOCUS_JOB_TTL_SECONDS', 60 * 60))
+
+PENDING, RUNNING, DONE, FAILED, CANCELLED = 'pendente', 'executando', 'concluído', 'erro', 'cancelado'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Levantada dentro do job, no próximo relato de progresso, quando o cancelamento é solicitado."""
+
+
+class Job:
+    def __init__(self, job_id, name, cancellable=True):
+        self.id = job_id
+        self.name = name
+        # Só as funções que relatam o progresso podem ser interrompidas durante a execução
+        self.cancellable = cancellable
+        self.status = PENDING
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        self.future = None
+        self.sessions = set()  # Sessões que aguardam o resultado
+        self.dropped = set()  # Sessões que cancelaram o job pelo botão
+        self._cancel = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def report(self, fraction):
+        """Atualiza o progresso (0 a 1); interrompe o job se o cancelamento foi solicitado."""
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self.progress = min(max(float(fraction), 0.0), 1.0)
+
+    def cancel(self):
+        self._cancel.set()
+        # Jobs que ainda não começaram são removidos da fila imediatamente
+        if self.future is not None and self.future.cancel():
+            self.status = CANCELLED
+            self.finished_at = time.time()
+
+
+def _fingerprint(value):
+    # Identificação estável dos argumentos, usada para reaproveitar jobs idênticos entre sessões
+    if isinstance(value, pd.DataFrame):
+        # As colunas de geometria não são hasheáveis: o conteúdo é identificado pelas colunas básicas,
+        # e o dataset de origem pelo 'scope' do JobRunner.submit
+        columns = [col for col in ('timestamp', 'registrationID', 'latitude', 'longitude') if col in value.columns]
+        hashed = pd.util.hash_pandas_object(value[columns], index=True).to_numpy()
+        return f'df:{len(value)}:{list(value.columns)!r}:{hashlib.sha256(hashed.tobytes()).hexdigest()}'
+    if isinstance(value, (list, tuple)):
+        return '[' + ','.join(_fingerprint(item) for item in value) + ']'
+    return repr(value)
+
+
+class JobRunner:
+    """
+    Executor das análises demoradas em segundo plano, compartilhado por todas as sessões.
+
+    Cada job é identificado pelo nome e pelos argumentos: submeter novamente o mesmo
+    trabalho (na mesma ou em outra sessão) devolve o job já existente. As funções que
+    aceitam o parâmetro 'progress' recebem Job.report para relatar o andamento e
+    permitir o cancelamento.
+
+    Um job compartilhado só é interrompido quando nenhuma sessão o aguarda mais. Quem o
+    cancela (cancel) passa a vê-lo como cancelado, enquanto ele continua para as demais;
+    quem apenas troca de parâmetros (release) deixa de aguardá-lo, mas volta a encontrá-lo
+    normalmente ao retornar aos mesmos parâmetros.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='geofocus-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name, func, *args, restart=False, session_id=None, scope=None, **kwargs):
+        # 'scope' (ex.: a chave do dataset no geo_store) separa jobs de dados com argumentos coincidentes
+        job_id = hashlib.sha256(
+            '|'.join([name, repr(scope), _fingerprint(args), _fingerprint(sorted(kwargs.items()))]).encode()
+        ).hexdigest()[:16]
+
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+            if job is not None and job.status == DONE:
+                # O resultado já existe: qualquer sessão volta a usá-lo
+                job.dropped.discard(session_id)
+                job.sessions.add(session_id)
+                return job
+            if job is not None:
+                # A sessão que cancelou o job só volta a aguardá-lo quando solicitado (restart=True)
+                wanted = restart or session_id not in job.dropped
+                # Jobs com erro só são executados novamente quando solicitado; cancelados, por quem não os cancelou
+                rerun = (job.status == FAILED and restart) or (job.status == CANCELLED and wanted)
+                if not rerun:
+                    if wanted:
+                        job.dropped.discard(session_id)
+                        job.sessions.add(session_id)
+                        job._cancel.clear()  # Volta a ter quem aguarde: desfaz um cancelamento ainda não atendido
+                    return job
+
+            cancellable = 'progress' in inspect.signature(func).parameters
+            job = self._jobs[job_id] = Job(job_id, name, cancellable)
+            job.sessions.add(session_id)
+            if cancellable:
+                kwargs['progress'] = job.report
+            job.future = self._executor.submit(self._run, job, func, args, kwargs)
+            return job
+
+    def cancel(self, job_id, session_id=None):
+        """Cancela o job para a sessão, que só é interrompido quando nenhuma outra sessão o aguarda."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.dropped.add(session_id)
+            self._release(job, session_id)
+
+    def release(self, job_id, session_id=None):
+        """Retira a sessão do job sem marcá-lo como cancelado para ela (ex.: parâmetros alterados)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._release(job, session_id)
+
+    def _release(self, job, session_id):
+        job.sessions.discard(session_id)
+        if not job.sessions and not job.finished:
+            job.cancel()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def table(self):
+        with self._lock:
+            return [
+                {'job': job.id, 'análise': job.name, 'status': job.status,
+                 'progresso': round(job.progress * 100), 'sessões': len(job.sessions)}
+                for job in self._jobs.values()
+            ]
+
+    def _run(self, job, func, args, kwargs):
+        job.status = RUNNING
+        try:
+            job.result = func(*args, **kwargs)
+            job.progress = 1.0
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = e
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def _expire(self):
+        now = time.time()
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished and now - job.finished_at > JOB_TTL_SECONDS]:
+            del self._jobs[job_id]
+
+
+def _session_id():
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+
+@st.cache_resource
+def get_runner():
+    return JobRunner()
+
+
+def submit(name, func, *args, restart=False, **kwargs):
+    """
+    Submete (ou reaproveita) um job e o associa à sessão atual pelo nome.
+
+    Os jobs são separados por dataset da sessão (geo_store). Se a sessão aguardava outro
+    job com esse nome (ex.: parâmetros alterados), ele é liberado: deixa a fila, ou é
+    interrompido, quando nenhuma outra sessão o aguarda.
+    """
+    runner = get_runner()
+    session_id = _session_id()
+    job = runner.submit(name, func, *args, restart=restart, session_id=session_id,
+                        scope=st.session_state.get('dataset_key'), **kwargs)
+    jobs = st.session_state.setdefault('jobs', {})
+    previous = jobs.get(name)
+    if previous is not None and previous != job.id:
+        runner.release(previous, session_id)
+    jobs[name] = job.id
+    return job
+
+
+def session_job(name):
+    """Retorna o último job da sessão com esse nome, ou None."""
+    job_id = st.session_state.get('jobs', {}).get(name)
+    return get_runner().get(job_id) if job_id is not None else None
+
+
+def status(job):
+    """Situação do job para a sessão atual: cancelado se ela o cancelou, ainda que outras o aguardem."""
+    return CANCELLED if _session_id() in job.dropped else job.status
+
+
+@st.fragment(run_every='1s')
+def job_status(job_id, label):
+    """Exibe o andamento do job e um botão de cancelamento; recarrega a página quando ele termina."""
+    job = get_runner().get(job_id)
+    if job is None or status(job) in FINISHED:
+        st.rerun()
+
+    st.progress(job.progress, text=f"{label} ({job.status}, {round(job.progress * 100)}%)")
+    # Funções sem relato de progresso só podem ser canceladas enquanto aguardam na fila
+    if job.cancellable or job.status == PENDING:
+        if st.button("Cancelar", key=f'cancel_{job_id}'):
+            get_runner().cancel(job_id, _session_id())
+            st.rerun()
@@ -0,0 +1,262 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+import streamlit as st
+
+try:
+    import resource  # Indisponível no Windows
+except ImportError:
+    resource = None
+
+try:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError:
+    get_script_run_ctx = lambda suppress_warning=False: None
+
+# Log estruturado (uma linha JSON por chamada) para análise fora do Streamlit
+logger = logging.getLogger("geofocus.profiling")
+
+# Destino do log estruturado: caminho de um arquivo JSON lines, '-' para stderr ou vazio (desativado)
+PROFILING_LOG = os.environ.get('GEOFOCUS_PROFILING_LOG', '')
+
+# Quantidade máxima de registros mantidos por sessão e no processo
+MAX_RECORDS = 200
+
+# Registros das etapas executadas fora de uma sessão (servidor de tiles, jobs em segundo plano)
+_background_records = deque(maxlen=MAX_RECORDS)
+
+# Pilha de chamadas instrumentadas da thread atual, usada para detectar acertos do cache
+_local = threading.local()
+
+# cProfile e tracemalloc valem para o processo inteiro: apenas uma etapa por vez os utiliza
+_deep_lock = threading.Lock()
+
+
+def configure_logging(destination=PROFILING_LOG):
+    """Direciona o log estruturado para 'destination' (arquivo ou '-' para stderr); chamadas repetidas não têm efeito."""
+    if not destination or logger.handlers:
+        return
+    handler = logging.StreamHandler() if destination == '-' else logging.FileHandler(destination, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False  # Evita repetir as linhas nos handlers do Streamlit
+
+
+def _has_session():
+    # Threads sem sessão (tiles, jobs) são esperadas: dispensa o aviso de ScriptRunContext ausente
+    return get_script_run_ctx(suppress_warning=True) is not None
+
+
+def deep_profiling_enabled():
+    """Indica se o perfilamento detalhado (cProfile/tracemalloc) está ativo na sessão."""
+    return _has_session() and st.session_state.get('profiling_deep', False)
+
+
+def _rows(obj):
+    # Conta linhas de DataFrames (ou do primeiro elemento de uma tupla de DataFrames)
+    if isinstance(obj, tuple) and obj:
+        obj = obj[0]
+    if hasattr(obj, 'shape') and hasattr(obj, 'columns'):
+        return int(obj.shape[0])
+    return None
+
+
+def _rss_peak_mb():
+    # Pico de memória residente do processo (ru_maxrss é em KB no Linux)
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _store(record):
+    logger.info(json.dumps(record, default=str))
+    if _has_session():
+        records = st.session_state.setdefault('profiling_records', deque(maxlen=MAX_RECORDS))
+        records.append(record)
+    else:
+        _background_records.append(record)
+
+
+@contextmanager
+def measure(name, rows_in=None):
+    """
+    Mede um trecho de código e registra o resultado como uma etapa.
+
+    O dicionário retornado pode ser completado pelo chamador (ex.: 'rows_out', 'cache').
+    """
+    deep = deep_profiling_enabled()
+    record = {
+        'stage': name,
+        'rows_in': rows_in,
+        'rows_out': None,
+        'cache': None,
+        'wall_ms': None,
+        'rss_peak_mb': _rss_peak_mb(),
+        'alloc_peak_mb': None,
+        'started_at': time.strftime('%H:%M:%S'),
+    }
+
+    # Etapas aninhadas ou simultâneas (outras sessões) entram no perfil da etapa que detém o lock
+    profiler = None
+    owner = deep and _deep_lock.acquire(blocking=False)
+    if owner:
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['wall_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        if owner:
+            profiler.disable()
+            record['alloc_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1024 ** 2, 1)
+            if started_tracemalloc:
+                tracemalloc.stop()
+            _deep_lock.release()
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(15)
+            record['profile'] = stream.getvalue()
+        # Mostra se a chamada elevou o pico de memória do processo
+        rss_after = _rss_peak_mb()
+        if rss_after is not None:
+            record['rss_growth_mb'] = round(rss_after - record['rss_peak_mb'], 1)
+            record['rss_peak_mb'] = rss_after
+        _store(record)
+
+
+# Bibliotecas pesadas cuja presença em memória é registrada a cada execução de página
+HEAVY_MODULES = ('geopandas', 'sklearn', 'pydeck', 'h3', 'geopy', 'altair')
+
+# A primeira execução de página do processo é registrada como partida a frio
+_cold_start = True
+
+
+@contextmanager
+def measure_run():
+    """Mede a execução completa da página; a primeira do processo é registrada como 'cold_start'."""
+    global _cold_start
+    name, _cold_start = ('cold_start' if _cold_start else 'page_run'), False
+    with measure(name) as record:
+        try:
+            yield record
+        finally:
+            record['heavy_modules'] = ','.join(mod for mod in HEAVY_MODULES if mod in sys.modules)
+
+
+def stage(func):
+    """Decorador que instrumenta uma função de processamento sem cache."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with measure(func.__name__, rows_in=_rows(args[0]) if args else None) as record:
+            result = func(*args, **kwargs)
+            record['rows_out'] = _rows(result)
+        return result
+
+    return wrapper
+
+
+def cached_stage(**cache_kwargs):
+    """
+    Equivalente a st.cache_data(**cache_kwargs), com instrumentação.
+
+    Além do tempo e das linhas, registra se a chamada foi atendida pelo cache
+    do Streamlit ('hit') ou se a função precisou ser executada ('miss').
+    """
+    def decorator(func):
+        @wraps(func)
+        def probe(*args, **kwargs):
+            # Só é executado quando o st.cache_data não encontra o resultado
+            stack = getattr(_local, 'stack', None)
+            if stack:
+                stack[-1]['cache'] = 'miss'
+            return func(*args, **kwargs)
+
+        cached = st.cache_data(**cache_kwargs)(probe)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            stack = _local.__dict__.setdefault('stack', [])
+            with measure(func.__name__, rows_in=_rows(args[0]) if args else None) as record:
+                record['cache'] = 'hit'
+                stack.append(record)
+                try:
+                    result = cached(*args, **kwargs)
+                finally:
+                    stack.pop()
+                record['rows_out'] = _rows(result)
+            return result
+
+        wrapper.clear = cached.clear
+        return wrapper
+
+    return decorator
+
+
+def render_diagnostics():
+    """Painel opcional na barra lateral com as últimas etapas medidas na sessão."""
+    with st.sidebar:
+        if not st.toggle("Diagnóstico de desempenho", key='profiling_panel'):
+            return
+
+        st.toggle("Perfilamento detalhado (cProfile/tracemalloc)", key='profiling_deep')
+
+        # Importação local: geo_store depende deste módulo
+        import geo_store
+        datasets = geo_store.get_store().stats()
+        if datasets:
+            st.caption("Datasets compartilhados no processo:")
+            st.dataframe(datasets, hide_index=True)
+
+        import geo_jobs
+        jobs = geo_jobs.get_runner().table()
+        if jobs:
+            st.caption("Jobs em segundo plano no processo:")
+            st.dataframe(jobs, hide_index=True)
+
+        columns = ['started_at', 'stage', 'wall_ms', 'cache', 'rows_in', 'rows_out',
+                   'alloc_peak_mb', 'rss_peak_mb', 'rss_growth_mb', 'heavy_modules']
+
+        background = list(_background_records)
+        if background:
+            with st.expander("Etapas em segundo plano (tiles e jobs)"):
+                st.dataframe(
+                    [{col: record.get(col) for col in columns} for record in reversed(background)],
+                    hide_index=True,
+                )
+
+        # Renderizado antes da página: mostra as etapas até a execução anterior
+        records = list(st.session_state.get('profiling_records', []))
+        if not records:
+            st.caption("Nenhuma etapa medida nesta sessão.")
+            return
+
+        st.dataframe(
+            [{col: record.get(col) for col in columns} for record in reversed(records)],
+            hide_index=True,
+        )
+
+        profiled = [record for record in records if record.get('profile')]
+        if profiled:
+            last = profiled[-1]
+            with st.expander(f"cProfile: {last['stage']}"):
+                st.code(last['profile'])
+
+        if st.button("Limpar medições"):
+            st.session_state.profiling_records.clear()
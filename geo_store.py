@@ -0,0 +1,291 @@
+import atexit
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import pandas as pd
+import streamlit as st
+
+import geo_index
+import geo_profiling as gp
+
+try:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError:
+    get_script_run_ctx = lambda suppress_warning=False: None
+
+# Memória máxima (MB) ocupada pelos datasets em uso antes de descarregar os ociosos para o disco
+MEMORY_BUDGET_MB = float(os.environ.get('GEOFOCUS_STORE_BUDGET_MB', 2048))
+
+# Tempo (s) sem acesso após o qual a sessão deixa de prender o dataset em memória
+SESSION_IDLE_SECONDS = int(os.environ.get('GEOFOCUS_SESSION_IDLE_SECONDS', 30 * 60))
+
+# Diretório do cache em disco dos datasets descarregados
+SPILL_DIR = os.environ.get('GEOFOCUS_STORE_DIR', os.path.join(tempfile.gettempdir(), 'geofocus_store'))
+
+
+def dataset_key(uploaded_files):
+    """Calcula o identificador do dataset a partir do conteúdo dos arquivos enviados."""
+    digest = hashlib.sha256()
+    for uploaded_file in sorted(uploaded_files, key=lambda f: f.name):
+        digest.update(uploaded_file.getvalue())
+    return digest.hexdigest()
+
+
+def _session_id():
+    # Sem sessão nas threads do servidor de tiles e dos jobs; não é motivo para aviso
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+
+def _session_alive(session_id):
+    # Consulta o runtime do Streamlit; fora dele (ex.: scripts) a sessão é considerada ativa
+    try:
+        from streamlit.runtime import Runtime
+        return Runtime.instance().is_active_session(session_id)
+    except Exception:
+        return True
+
+
+class _Entry:
+    def __init__(self, df, index):
+        self.df = df
+        self.index = index
+        # O índice espacial também conta para o orçamento de memória
+        self.nbytes = int(df.memory_usage(deep=True).sum()) + index.nbytes
+        self.path = None
+        self.last_access = time.time()
+        self.sessions = {}  # session_id -> último acesso
+
+    def refcount(self, now):
+        # Sessões ociosas continuam associadas ao dataset, mas não o prendem em memória
+        return sum(1 for seen in self.sessions.values() if now - seen < SESSION_IDLE_SECONDS)
+
+
+class DatasetStore:
+    """
+    Registro de datasets compartilhado por todas as sessões do processo.
+
+    Cada dataset é mantido uma única vez em memória, identificado pelo hash dos
+    arquivos de origem; as sessões guardam apenas a chave. Quando o total em
+    memória excede o orçamento, os datasets sem sessões ativas são gravados em
+    disco (do menos para o mais recentemente usado) e recarregados sob demanda.
+
+    O processamento de um dataset, sua releitura e sua gravação em disco ocorrem fora
+    do lock do registro: somente quem aguarda aquele mesmo dataset espera por ele. Um
+    dataset só é removido (inclusive do disco) quando nenhuma das sessões associadas a
+    ele continua aberta no Streamlit e ele não é acessado há SESSION_IDLE_SECONDS; os
+    arquivos restantes são apagados ao encerrar o processo.
+    """
+
+    def __init__(self, budget_mb=MEMORY_BUDGET_MB, spill_dir=SPILL_DIR):
+        self.budget_bytes = budget_mb * 1024 ** 2
+        self.spill_dir = spill_dir
+        self._process_dir = None
+        self._entries = OrderedDict()
+        self._loading = {}  # chave -> Future do carregamento em andamento
+        self._spilling = set()  # chaves sendo gravadas em disco
+        self._lock = threading.Lock()
+
+    def acquire(self, key, loader, session_id=None):
+        """Retorna o dataset 'key', criando-o com loader() se ainda não existir, e registra a sessão."""
+        with gp.measure('dataset_store') as record:
+            df, _, loaded = self._load(key, loader, session_id)
+            record['cache'] = 'miss' if loaded else 'hit'
+            record['rows_out'] = len(df)
+            return df
+
+    def get(self, key, session_id=None):
+        """Retorna o dataset 'key' (recarregando-o do disco se necessário) ou None se for desconhecido."""
+        loaded = self._load(key, None, session_id)
+        return loaded[0] if loaded is not None else None
+
+    def get_index(self, key, session_id=None):
+        """Retorna o índice espacial do dataset 'key', construído no carregamento, ou None."""
+        loaded = self._load(key, None, session_id)
+        return loaded[1] if loaded is not None else None
+
+    def release(self, key, session_id=None):
+        """Remove a referência da sessão ao dataset, tornando-o elegível para descarregamento."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.sessions.pop(session_id, None)
+            spills = self._evict()
+        self._spill(spills)
+
+    def stats(self):
+        with self._lock:
+            now = time.time()
+            return [
+                {
+                    'dataset': key[:12],
+                    'mb': round(entry.nbytes / 1024 ** 2, 1),
+                    'sessions': entry.refcount(now),
+                    'in_memory': entry.df is not None,
+                }
+                for key, entry in self._entries.items()
+            ]
+
+    def _load(self, key, loader, session_id):
+        """
+        Retorna (df, índice, carregado agora) do dataset 'key', ou None se ele não existir
+        e não houver loader. Apenas a primeira chamada para a chave executa o carregamento;
+        as demais aguardam o mesmo Future, sem bloquear os outros datasets.
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry.df is not None:
+                    self._touch(key, entry, session_id)
+                    df, index = entry.df, entry.index
+                    spills = self._evict()
+                    break
+                pending = self._loading.get(key)
+                if pending is None:
+                    if entry is None and loader is None:
+                        return None
+                    pending = self._loading[key] = Future()
+                    spills = None
+                    break
+            # Outra thread já está carregando este dataset: aguarda e consulta novamente
+            pending.result()
+
+        if spills is not None:
+            self._spill(spills)
+            return df, index, False
+
+        try:
+            if entry is None:
+                df = loader()
+            else:
+                with gp.measure('dataset_store_reload') as record:
+                    df = pd.read_pickle(entry.path)
+                    record['rows_out'] = len(df)
+            index = geo_index.SpatialIndex.from_frame(df)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            pending.set_exception(e)
+            raise
+
+        with self._lock:
+            if entry is None:
+                entry = _Entry(df, index)
+            else:
+                entry.df, entry.index = df, index
+            self._entries[key] = entry
+            del self._loading[key]
+            self._touch(key, entry, session_id)
+            spills = self._evict()
+        pending.set_result(None)
+        self._spill(spills)
+        return df, index, True
+
+    def _touch(self, key, entry, session_id):
+        entry.last_access = time.time()
+        if session_id is not None:
+            entry.sessions[session_id] = entry.last_access
+        self._entries.move_to_end(key)
+
+    def _evict(self):
+        """
+        Descarrega da memória os datasets ociosos além do orçamento (chamado com o lock).
+        Retorna os que ainda precisam ser gravados em disco, o que é feito por _spill, fora do lock.
+        """
+        now = time.time()
+        self._expire(now)
+        spills = []
+        in_memory = sum(entry.nbytes for entry in self._entries.values() if entry.df is not None)
+        for key, entry in self._entries.items():  # Do menos para o mais recentemente usado
+            if in_memory <= self.budget_bytes:
+                break
+            if entry.df is None or key in self._spilling or entry.refcount(now) > 0:
+                continue
+            if entry.path is None:
+                self._spilling.add(key)
+                spills.append((key, entry, os.path.join(self._spill_dir(), f'{key}.pkl')))
+            else:
+                entry.df = None
+                entry.index = None
+            in_memory -= entry.nbytes
+        return spills
+
+    def _spill(self, spills):
+        # Enquanto o arquivo é gravado, as consultas continuam usando o DataFrame em memória
+        while spills:
+            key, entry, path = spills.pop()
+            try:
+                entry.df.to_pickle(path)
+            except BaseException:
+                with self._lock:
+                    self._spilling.discard(key)
+                raise
+            with self._lock:
+                self._spilling.discard(key)
+                if self._entries.get(key) is not entry:
+                    os.remove(path)  # Removido do registro durante a gravação
+                    continue
+                entry.path = path
+                spills += self._evict()  # Agora pode deixar a memória, se ainda estiver ocioso
+
+    def _expire(self, now):
+        # Sessões ociosas só perdem a referência quando o Streamlit já as encerrou
+        for entry in self._entries.values():
+            entry.sessions = {sid: seen for sid, seen in entry.sessions.items()
+                              if now - seen < SESSION_IDLE_SECONDS or _session_alive(sid)}
+        # Datasets sem nenhuma sessão (encerradas ou liberadas) e sem acesso recente saem do registro e do disco
+        expired = [key for key, entry in self._entries.items()
+                   if not entry.sessions and now - entry.last_access >= SESSION_IDLE_SECONDS
+                   and key not in self._loading and key not in self._spilling]
+        for key in expired:
+            entry = self._entries.pop(key)
+            if entry.path is not None and os.path.exists(entry.path):
+                os.remove(entry.path)
+
+    def _spill_dir(self):
+        # Subdiretório exclusivo do processo, apagado ao encerrar
+        if self._process_dir is None:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            self._process_dir = tempfile.mkdtemp(prefix=f'{os.getpid()}_', dir=self.spill_dir)
+            atexit.register(shutil.rmtree, self._process_dir, True)
+        return self._process_dir
+
+
+@st.cache_resource
+def get_store():
+    return DatasetStore()
+
+
+def open_dataset(uploaded_files, loader):
+    """Associa a sessão ao dataset dos arquivos enviados, processando-os apenas se nenhuma sessão já o fez."""
+    key = dataset_key(uploaded_files)
+    store = get_store()
+    previous = st.session_state.get('dataset_key')
+    if previous is not None and previous != key:
+        store.release(previous, _session_id())
+    df = store.acquire(key, loader, _session_id())
+    st.session_state.dataset_key = key
+    return df
+
+
+def current_dataset():
+    """Retorna o dataset da sessão atual ou None se nenhum foi carregado."""
+    key = st.session_state.get('dataset_key')
+    if key is None:
+        return None
+    return get_store().get(key, _session_id())
+
+
+def current_index():
+    """Retorna o índice espacial do dataset da sessão atual ou None se nenhum foi carregado."""
+    key = st.session_state.get('dataset_key')
+    if key is None:
+        return None
+    return get_store().get_index(key, _session_id())
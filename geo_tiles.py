@@ -0,0 +1,445 @@
+import hashlib
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import numpy as np
+import streamlit as st
+
+import geo_functions as gf
+import geo_index as gi
+import geo_profiling as gp
+import geo_store as gs
+
+logger = logging.getLogger("geofocus.tiles")
+
+# Interface e porta do servidor de tiles, e URL pela qual o navegador o acessa. Por padrão o
+# servidor só aceita conexões locais: os tiles expõem as localizações de cada dispositivo
+TILE_HOST = os.environ.get('GEOFOCUS_TILE_HOST', '127.0.0.1')
+TILE_PORT = int(os.environ.get('GEOFOCUS_TILE_PORT', 8765))
+TILE_URL = os.environ.get('GEOFOCUS_TILE_URL', f'http://localhost:{TILE_PORT}')
+
+# Quantidade de tiles codificados mantidos em memória
+TILE_CACHE_SIZE = int(os.environ.get('GEOFOCUS_TILE_CACHE_SIZE', 4096))
+
+# Quantidade de seleções de dispositivos registradas no servidor (referenciadas pelas URLs)
+MAX_SELECTIONS = 1024
+
+# Quantidade de combinações dataset/filtros com as contagens por hexágono mantidas em memória
+HEXAGON_LEVELS_CACHE_SIZE = 16
+
+# Zoom máximo pedido pelo MVTLayer (acima dele os tiles são ampliados no navegador)
+MAX_ZOOM = 16
+
+# Resolução interna dos tiles (padrão do Mapbox Vector Tile)
+EXTENT = 4096
+
+LAYERS = ('points', 'hexagons')
+
+
+# --- Codificação Mapbox Vector Tile (protobuf) ---
+
+def _varint(value):
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 31)
+
+
+def _field(number, wire_type, payload):
+    key = _varint((number << 3) | wire_type)
+    if wire_type == 2:
+        return key + _varint(len(payload)) + payload
+    return key + payload
+
+
+def _packed(number, values):
+    return _field(number, 2, b''.join(_varint(v) for v in values))
+
+
+def _command(command_id, count):
+    return (command_id & 0x7) | (count << 3)
+
+
+def _point_geometry(x, y):
+    return [_command(1, 1), _zigzag(x), _zigzag(y)]
+
+
+def _polygon_geometry(ring):
+    # O anel externo deve ter área positiva (sentido horário com o eixo y para baixo)
+    area = sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]))
+    if area < 0:
+        ring = ring[::-1]
+
+    geometry = [_command(1, 1)]
+    cursor_x, cursor_y = 0, 0
+    for i, (x, y) in enumerate(ring):
+        if i == 1:
+            geometry.append(_command(2, len(ring) - 1))
+        geometry += [_zigzag(x - cursor_x), _zigzag(y - cursor_y)]
+        cursor_x, cursor_y = x, y
+    geometry.append(_command(7, 1))
+    return geometry
+
+
+def _value(value):
+    if isinstance(value, str):
+        return _field(1, 2, value.encode('utf-8'))
+    return _field(5, 0, _varint(int(value)))  # uint_value
+
+
+def encode_layer(name, features):
+    """
+    Codifica uma camada MVT. 'features' é uma lista de (tipo, geometria, propriedades),
+    com tipo 1 (ponto) ou 3 (polígono) e a geometria já em comandos MVT.
+    """
+    keys, values = {}, {}
+    encoded = []
+    for feature_id, (geom_type, geometry, properties) in enumerate(features, start=1):
+        tags = []
+        for key, value in properties.items():
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault(value, len(values)))
+        feature = (_field(1, 0, _varint(feature_id)) + _packed(2, tags)
+                   + _field(3, 0, _varint(geom_type)) + _packed(4, geometry))
+        encoded.append(_field(2, 2, feature))
+
+    layer = _field(15, 0, _varint(2)) + _field(1, 2, name.encode('utf-8'))
+    layer += b''.join(encoded)
+    layer += b''.join(_field(3, 2, key.encode('utf-8')) for key in keys)
+    layer += b''.join(_field(4, 2, _value(value)) for value in values)
+    layer += _field(5, 0, _varint(EXTENT))
+    return _field(3, 2, layer)
+
+
+# --- Geometria dos tiles (Web Mercator) ---
+
+def tile_bbox(z, x, y):
+    """Retângulo (lon_min, lat_min, lon_max, lat_max) coberto pelo tile z/x/y."""
+    n = 2 ** z
+
+    def lat(ty):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+
+    return x / n * 360 - 180, lat(y + 1), (x + 1) / n * 360 - 180, lat(y)
+
+
+def _to_tile(lat, lon, z, x, y):
+    # Converte coordenadas para o sistema interno do tile (0..EXTENT, y para baixo)
+    n = 2 ** z
+    lat = np.radians(np.clip(lat, -85.0511, 85.0511))
+    px = (np.asarray(lon) + 180) / 360 * n
+    py = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / math.pi) / 2 * n
+    return np.round((px - x) * EXTENT).astype('int64'), np.round((py - y) * EXTENT).astype('int64')
+
+
+# --- Filtros codificados na URL dos tiles ---
+
+def filter_query(start_hour=0, end_hour=23, days_numbers=None, selection=None, h3_res=None):
+    """
+    Monta a query string de filtros usada nas URLs dos tiles (parâmetros padrão são omitidos).
+    'selection' é o identificador devolvido por TileServer.register_selection. Nenhum dia
+    selecionado é codificado como 'days=' (vazio), distinto da ausência do parâmetro.
+    """
+    params = {}
+    if (start_hour, end_hour) != (0, 23):
+        params['hours'] = f'{start_hour}-{end_hour}'
+    if days_numbers is not None and sorted(days_numbers) != list(range(7)):
+        params['days'] = ''.join(str(day) for day in sorted(days_numbers))
+    if selection is not None:
+        params['sel'] = selection
+    if h3_res is not None:
+        params['res'] = h3_res
+    return urlencode(params)
+
+
+def _parse_filters(query, selected_ids=lambda selection: None):
+    # Levanta ValueError para filtros inválidos ou seleções desconhecidas (respondidos com 400)
+    # keep_blank_values: 'days=' (nenhum dia selecionado) não pode virar "todos os dias"
+    params = parse_qs(query, keep_blank_values=True)
+    start_hour, end_hour = 0, 23
+    if 'hours' in params:
+        start_hour, end_hour = (int(part) for part in params['hours'][0].split('-'))
+    days_numbers = tuple(int(day) for day in params['days'][0]) if 'days' in params else None
+    ids = None
+    if 'sel' in params:
+        ids = selected_ids(params['sel'][0])
+        if ids is None:
+            raise ValueError(f"seleção desconhecida: {params['sel'][0]}")
+    h3_res = int(params['res'][0]) if 'res' in params else None
+    if h3_res is not None and h3_res not in gf.H3_RESOLUTIONS:
+        raise ValueError(f"resolução H3 inválida: {h3_res}")
+    return start_hour, end_hour, days_numbers, ids, h3_res
+
+
+# --- Construção dos tiles ---
+
+def _filter_mask(rows, filters):
+    start_hour, end_hour, days_numbers, ids, _ = filters
+    mask = gf.weekhour_mask(start_hour, end_hour, days_numbers)[rows['weekhour'].to_numpy()]
+    if ids is not None:
+        mask &= rows['registrationID'].astype(str).isin(list(ids)).to_numpy()
+    return mask
+
+
+def _tile_rows(df, index, bbox, filters):
+    rows = df.iloc[index.query(bbox)]
+    return rows[_filter_mask(rows, filters)]
+
+
+def build_points_tile(df, index, z, x, y, filters=(0, 23, None, None, None)):
+    """Pontos do tile, agregados por posição na grade do tile (propriedade 'count')."""
+    rows = _tile_rows(df, index, tile_bbox(z, x, y), filters)
+    if rows.empty:
+        return b''
+    tx, ty = _to_tile(rows['latitude'].to_numpy(), rows['longitude'].to_numpy(), z, x, y)
+    # Pontos que caem no mesmo pixel do tile viram uma única feição com contagem
+    cells, counts = np.unique(np.column_stack((tx, ty)), axis=0, return_counts=True)
+    features = [(1, _point_geometry(int(px), int(py)), {'count': int(count)})
+                for (px, py), count in zip(cells, counts)]
+    return encode_layer('points', features)
+
+
+def hexagon_levels(df, filters, finest_res, coarsest_res=min(gf.H3_RESOLUTIONS)):
+    """
+    Contagens por hexágono do dataset filtrado em todas as resoluções até 'finest_res'.
+
+    As linhas são agrupadas uma única vez, na resolução mais fina; as demais vêm do
+    h3_rollup. Cada nível traz também um índice espacial dos centros dos hexágonos.
+    """
+    import h3
+
+    column = f'h3_res_{finest_res}'
+    grouped_h3 = (
+        df.loc[_filter_mask(df, filters), column]
+        .value_counts()
+        .rename_axis('hex')
+        .reset_index(name='count')
+    )
+
+    levels = {}
+    for res, counts in gf.h3_rollup(grouped_h3, finest_res, coarsest_res).items():
+        centers = np.array([h3.cell_to_latlng(cell) for cell in counts['hex']]).reshape(-1, 2)
+        levels[res] = (counts, gi.SpatialIndex(centers[:, 0], centers[:, 1]))
+    return levels
+
+
+def build_hexagons_tile(levels, z, x, y, h3_res=None):
+    """
+    Contagem por hexágono H3 (de hexagon_levels) para todos os hexágonos que cruzam o tile.
+
+    O MVTLayer recorta cada tile nos seus limites, então um hexágono da borda é repetido em
+    todos os tiles que ele cruza; a propriedade 'hex' identifica as cópias (uniqueIdProperty).
+    """
+    import h3
+
+    h3_res = min(max(h3_res or gf.h3_resolution_for_zoom(z), min(levels)), max(levels))
+    counts, centers = levels[h3_res]
+    lon_min, lat_min, lon_max, lat_max = tile_bbox(z, x, y)
+
+    # Amplia o recorte em uma aresta de hexágono para incluir os hexágonos com centro fora do tile
+    edge_deg = h3.average_hexagon_edge_length(h3_res, unit='km') * 1.5 / 111.32
+    lon_pad = edge_deg / max(math.cos(math.radians(max(abs(lat_min), abs(lat_max)))), 0.01)
+    found = centers.query((lon_min - lon_pad, lat_min - edge_deg, lon_max + lon_pad, lat_max + edge_deg))
+    if not len(found):
+        return b''
+
+    features = []
+    for cell, count in zip(counts['hex'].to_numpy()[found], counts['count'].to_numpy()[found]):
+        boundary = np.array(h3.cell_to_boundary(cell))
+        bx, by = _to_tile(boundary[:, 0], boundary[:, 1], z, x, y)
+        # Descarta os hexágonos da margem que não chegam a cruzar o tile
+        if bx.max() <= 0 or bx.min() >= EXTENT or by.max() <= 0 or by.min() >= EXTENT:
+            continue
+        ring = list(dict.fromkeys(zip(bx.tolist(), by.tolist())))  # Remove vértices repetidos
+        if len(ring) >= 3:
+            features.append((3, _polygon_geometry(ring), {'hex': cell, 'count': int(count)}))
+    return encode_layer('hexagons', features) if features else b''
+
+
+# --- Servidor HTTP ---
+
+class TileServer:
+    """
+    Servidor local de Mapbox Vector Tiles sobre os datasets do geo_store.
+
+    Atende /<dataset>/<camada>/<z>/<x>/<y>.pbf?<filtros>, com as camadas 'points' e
+    'hexagons', e mantém um cache LRU dos tiles já codificados. A seleção de dispositivos
+    fica registrada no servidor e a URL leva apenas seu identificador.
+
+    Os tiles de hexágonos de um mesmo dataset e filtro compartilham as contagens de
+    hexagon_levels, calculadas uma vez: a troca de resolução conforme o zoom apenas
+    escolhe outro nível do rollup.
+    """
+
+    def __init__(self, store, host=TILE_HOST, port=TILE_PORT, cache_size=TILE_CACHE_SIZE):
+        self.store = store
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._selections = OrderedDict()
+        self._levels = OrderedDict()  # (dataset, filtros) -> Future dos níveis de hexágonos
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='geofocus-tiles', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def register_selection(self, ids):
+        """Registra uma seleção de dispositivos e retorna o identificador curto usado nas URLs."""
+        ids = frozenset(str(reg_id) for reg_id in ids)
+        selection = hashlib.sha256('\n'.join(sorted(ids)).encode()).hexdigest()[:16]
+        with self._lock:
+            self._selections[selection] = ids
+            self._selections.move_to_end(selection)
+            if len(self._selections) > MAX_SELECTIONS:
+                self._selections.popitem(last=False)
+        return selection
+
+    def selected_ids(self, selection):
+        with self._lock:
+            return self._selections.get(selection)
+
+    def tile(self, key, layer, z, x, y, query=''):
+        if not (0 <= z <= 24 and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            raise ValueError(f"tile inválido: {z}/{x}/{y}")
+        cache_key = (key, layer, z, x, y, query)
+        with self._lock:
+            if cache_key in self._cache:
+                self._cache.move_to_end(cache_key)
+                return self._cache[cache_key]
+
+        filters = _parse_filters(query, self.selected_ids)
+        df = self.store.get(key)
+        index = self.store.get_index(key)
+        if df is None or index is None:
+            return None
+        with gp.measure(f'tile_{layer}') as record:
+            if layer == 'points':
+                data = build_points_tile(df, index, z, x, y, filters)
+            else:
+                data = build_hexagons_tile(self._hexagon_levels(key, df, filters), z, x, y, filters[4])
+            record['rows_in'] = len(df)
+
+        with self._lock:
+            self._cache[cache_key] = data
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return data
+
+    def _hexagon_levels(self, key, df, filters):
+        # Calculados por uma única requisição; as demais do mesmo dataset/filtro aguardam o resultado
+        levels_key = (key, filters)
+        with self._lock:
+            pending = self._levels.get(levels_key)
+            owner = pending is None
+            if owner:
+                pending = self._levels[levels_key] = Future()
+                if len(self._levels) > HEXAGON_LEVELS_CACHE_SIZE:
+                    self._levels.popitem(last=False)
+            else:
+                self._levels.move_to_end(levels_key)
+
+        if owner:
+            try:
+                # Com resolução fixa na URL basta esse nível; sem ela, todos até o zoom máximo
+                h3_res = filters[4]
+                if h3_res is None:
+                    levels = hexagon_levels(df, filters, gf.h3_resolution_for_zoom(MAX_ZOOM))
+                else:
+                    levels = hexagon_levels(df, filters, h3_res, h3_res)
+                pending.set_result(levels)
+            except Exception as e:
+                with self._lock:
+                    self._levels.pop(levels_key, None)
+                pending.set_exception(e)
+        return pending.result()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                parts = url.path.strip('/').split('/')
+                try:
+                    key, layer, z, x, y = parts[0], parts[1], int(parts[2]), int(parts[3]), int(parts[4].split('.')[0])
+                    if layer not in LAYERS:
+                        raise ValueError(layer)
+                    data = server.tile(key, layer, z, x, y, url.query)
+                except (IndexError, ValueError) as e:
+                    self.send_error(400, explain=str(e))
+                    return
+                except Exception:
+                    logger.exception("Erro ao gerar o tile %s", self.path)
+                    self.send_error(500)
+                    return
+                if data is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/vnd.mapbox-vector-tile')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass  # Evita uma linha de log por tile
+
+        return Handler
+
+
+@st.cache_resource
+def start_tile_server(_store, host=TILE_HOST, port=TILE_PORT):
+    """Inicia (uma vez por processo) o servidor de tiles em uma thread em segundo plano."""
+    return TileServer(_store, host, port).start()
+
+
+def tile_url(dataset_key, layer, query=''):
+    """URL modelo ({z}/{x}/{y}) dos tiles de uma camada para uso no MVTLayer do pydeck."""
+    url = f'{TILE_URL}/{dataset_key}/{layer}/{{z}}/{{x}}/{{y}}.pbf'
+    return f'{url}?{query}' if query else url
+
+
+# --- Uso nas páginas ---
+
+def tile_controls():
+    """Opção de carregar o mapa em tiles (na barra lateral); retorna a camada escolhida ou None."""
+    # Tiles vetoriais: o mapa busca no servidor local apenas os tiles visíveis, já filtrados
+    if not st.toggle("Carregar em tiles (MVT)", value=False):
+        return None
+    return st.radio("Camada dos tiles", list(LAYERS), horizontal=True,
+                    format_func={'points': "Pontos", 'hexagons': "Hexágonos"}.get)
+
+
+def tiles_chart(layer, view=None, start_hour=0, end_hour=23, days_numbers=None,
+                selected_registration_ids=None, map="Light", marker_size=3):
+    """Exibe o dataset da sessão em tiles, com os filtros aplicados pelo servidor de tiles."""
+    import pydeck as pdk
+
+    server = start_tile_server(gs.get_store())
+    selection = None
+    if selected_registration_ids is not None:
+        selection = server.register_selection(selected_registration_ids)
+    query = filter_query(start_hour, end_hour, days_numbers, selection)
+    url = tile_url(st.session_state.dataset_key, layer, query)
+
+    if view is None:
+        spatial_index = gs.current_index()
+        view = pdk.ViewState(latitude=(spatial_index.lat_min + spatial_index.lat_max) / 2,
+                             longitude=(spatial_index.lon_min + spatial_index.lon_max) / 2, zoom=10)
+    with gp.measure('pydeck_chart'):
+        st.pydeck_chart(gf.tiles_render(url, layer, map=map, view=view, marker_size=marker_size))